@@ -0,0 +1,141 @@
+"""Benchmark the storage settings of derived fields in HDF5 files.
+
+For each setting (chunking, compression filter, float32 downcasting,
+quantization), the script writes the field into a temporary file and
+reports the file size, the write time, and the read throughput
+(full field, z-slab, and slices normal to each direction).
+"""
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+import h5py
+import numpy
+
+import rodney
+
+
+SETTINGS = {
+    'contiguous': dict(),
+    'chunked': dict(chunks=True),
+    'lzf': dict(compression='lzf', shuffle=True),
+    'gzip-1': dict(compression='gzip', compression_opts=1, shuffle=True),
+    'gzip-4': dict(compression='gzip', compression_opts=4, shuffle=True),
+    'f32': dict(dtype='float32'),
+    'f32-gzip-4': dict(dtype='float32', compression='gzip',
+                       compression_opts=4, shuffle=True),
+    'f32-q12-gzip-4': dict(dtype='float32', keep_bits=12, compression='gzip',
+                           compression_opts=4, shuffle=True),
+    'f32-q8-gzip-4': dict(dtype='float32', keep_bits=8, compression='gzip',
+                          compression_opts=4, shuffle=True)
+}
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Benchmark the storage settings of derived fields.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('--file', dest='filepath',
+                        type=str,
+                        default=None,
+                        help='HDF5 file with the field to benchmark '
+                             '(default: synthetic field)')
+    parser.add_argument('--name', dest='name',
+                        type=str,
+                        default='qcrit',
+                        help='Name of the dataset')
+    parser.add_argument('--shape', dest='shape',
+                        nargs=3, type=int,
+                        default=(200, 250, 300),
+                        help='Shape (nz, ny, nx) of the synthetic field')
+    parser.add_argument('--settings', dest='settings',
+                        nargs='+', type=str,
+                        default=list(SETTINGS.keys()),
+                        choices=list(SETTINGS.keys()),
+                        help='Storage settings to benchmark')
+    parser.add_argument('--slab-size', dest='slab_size',
+                        type=int,
+                        default=32,
+                        help='Number of cells along z of a slab')
+    args = parser.parse_args()
+    return args
+
+
+def get_synthetic_field(shape):
+    """Return a smooth field with localized structures."""
+    nz, ny, nx = shape
+    z, y, x = numpy.meshgrid(numpy.linspace(-1.0, 1.0, num=nz),
+                             numpy.linspace(-1.0, 1.0, num=ny),
+                             numpy.linspace(-1.0, 3.0, num=nx),
+                             indexing='ij')
+    r2 = y**2 + z**2
+    return numpy.exp(-4 * r2) * numpy.sin(6 * x) * numpy.exp(-0.5 * x)
+
+
+def timeit(func):
+    """Return the wall-clock time of a call."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def benchmark(values, name, setting, tmpdir, slab_size):
+    """Write and read a field with a given storage setting."""
+    filepath = pathlib.Path(tmpdir) / 'field.h5'
+    storage = dict(setting)
+    if storage.get('chunks') is True:
+        storage['chunks'] = rodney.get_chunk_shape(values.shape)
+    t_write = timeit(lambda: rodney.write_field_hdf5(filepath, name, values,
+                                                     **storage))
+    size = filepath.stat().st_size
+    nz, ny, nx = values.shape
+    reads = {'full': (Ellipsis,),
+             'slab': (slice(nz // 2, min(nz // 2 + slab_size, nz)),),
+             'z-slice': (nz // 2,),
+             'y-slice': (slice(None), ny // 2),
+             'x-slice': (slice(None), slice(None), nx // 2)}
+    t_reads = {}
+    for key, index in reads.items():
+        # Re-open the file to start each read with an empty chunk cache.
+        with h5py.File(filepath, 'r') as infile:
+            dset = infile[name]
+            t_reads[key] = timeit(lambda: dset[index])
+    with h5py.File(filepath, 'r') as infile:
+        error = numpy.max(numpy.abs(infile[name][...] - values))
+    filepath.unlink()
+    return size, t_write, t_reads, error
+
+
+def main():
+    """Run the benchmark and print the results."""
+    args = parse_command_line()
+    if args.filepath is None:
+        values = get_synthetic_field(args.shape)
+    else:
+        with h5py.File(args.filepath, 'r') as infile:
+            values = infile[args.name][...]
+    nbytes = values.nbytes
+    print('Field: {} values ({:.1f} MiB)'.format(values.shape, nbytes / 2**20))
+    header = ('{:<16}{:>10}{:>8}{:>10}{:>11}' + '{:>10}' * 4 + '{:>11}')
+    print(header.format('setting', 'size[MiB]', 'ratio', 'write[s]',
+                        'read[MB/s]', 'slab[s]', 'z-sl[s]', 'y-sl[s]',
+                        'x-sl[s]', 'max-error'))
+    row = ('{:<16}{:>10.2f}{:>8.2f}{:>10.3f}{:>11.1f}' + '{:>10.4f}' * 4 +
+           '{:>11.2e}')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for key in args.settings:
+            size, t_write, t_reads, error = benchmark(values, args.name,
+                                                      SETTINGS[key], tmpdir,
+                                                      args.slab_size)
+            print(row.format(key, size / 2**20, nbytes / size, t_write,
+                             nbytes / 1e6 / t_reads['full'], t_reads['slab'],
+                             t_reads['z-slice'], t_reads['y-slice'],
+                             t_reads['x-slice'], error))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Check the parallel rendering of frames with a stand-in VisIt module.
+
+The script renders frames with `visitplot.visit_render_pool` using the
+stand-in module in misc/visitstub (no VisIt needed) and checks that the
+paths of the PNG files are returned sorted by job and state, that all
+files were written, and that the frames were shared by the processes.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+
+rootdir = pathlib.Path(__file__).absolute().parents[1]
+sys.path.insert(0, str(rootdir / 'misc' / 'visitstub'))
+sys.path.insert(0, str(rootdir / 'src' / 'python'))
+
+import visit  # noqa: E402 (stand-in module)
+import visitplot  # noqa: E402
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Check the pool of VisIt instances with a stand-in module.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('--nprocs', dest='nprocs',
+                        type=int,
+                        default=3,
+                        help='Number of VisIt instances')
+    return parser.parse_args()
+
+
+def main():
+    """Render the frames and check the paths of the PNG files."""
+    args = parse_command_line()
+    jobs = [visitplot.RenderJob(config_view=None, states=[5, 1, 3],
+                                prefix='lateral_'),
+            visitplot.RenderJob(config_view=None, states=None,
+                                prefix='top_', figsize=(800, 400)),
+            visitplot.RenderJob(config_view=None, states=slice(0, None, 2),
+                                prefix='perspective_')]
+    all_states = list(range(visit.NSTATES))
+    expected_states = [sorted([5, 1, 3]), all_states, all_states[::2]]
+    with tempfile.TemporaryDirectory() as out_dir:
+        filepaths = visitplot.visit_render_pool('fake.xmf', jobs,
+                                                nprocs=args.nprocs,
+                                                out_dir=out_dir)
+        expected = [os.path.join(out_dir, '{}{:0>7}.png'
+                                 .format(job.prefix, visit.TIMESTEPS[state]))
+                    for job, states in zip(jobs, expected_states)
+                    for state in states]
+        errors = []
+        if filepaths != expected:
+            errors.append('paths not sorted by job and state:\n{}'
+                          .format('\n'.join(filepaths)))
+        missing = [path for path in expected if not os.path.isfile(path)]
+        if missing:
+            errors.append('missing files: {}'.format(missing))
+        pids = set()
+        for path in expected:
+            if os.path.isfile(path):
+                with open(path, 'r') as infile:
+                    pids.add(infile.read().strip())
+        if args.nprocs > 1 and len(pids) != args.nprocs:
+            errors.append('frames rendered by {} process(es) instead of {}'
+                          .format(len(pids), args.nprocs))
+    if errors:
+        raise SystemExit('\n'.join(['[error] ' + error for error in errors]))
+    print('{} frames rendered by {} processes in the expected order'
+          .format(len(expected), len(pids)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Estimate the cost of a run before submitting it.
+
+The script reads the mesh and parameters of the configuration file,
+the volume probes, and the SLURM script of the run, and prints the estimated
+memory per rank, disk footprint, and wall time.
+The wall time is calibrated from the PETSc log files (view.log) of past runs.
+The script fails (non-zero exit code) if the run exceeds the quotas.
+"""
+
+import argparse
+import pathlib
+
+import rodney
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Estimate the memory, disk footprint, and wall time of a run.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('--simu-dir', dest='simudir',
+                        type=str,
+                        default='.',
+                        help='Simulation directory')
+    parser.add_argument('--nprocs', dest='nprocs',
+                        type=int,
+                        default=None,
+                        help='Number of MPI processes '
+                             '(default: from the SLURM script)')
+    parser.add_argument('--runs-dir', dest='runsdir',
+                        type=str,
+                        default=str(pathlib.Path(__file__).absolute()
+                                    .parents[1] / 'runs'),
+                        help='Directory with past runs (to calibrate '
+                             'the wall time from their log files)')
+    parser.add_argument('--disk-quota', dest='disk_quota',
+                        type=float,
+                        default=None,
+                        help='Available disk space (GiB)')
+    parser.add_argument('--memory-per-rank', dest='memory_per_rank',
+                        type=float,
+                        default=None,
+                        help='Available memory per rank (GiB)')
+    parser.add_argument('--time-limit', dest='time_limit',
+                        type=str,
+                        default=None,
+                        help='Wall-time limit (SLURM format; '
+                             'default: from the SLURM script)')
+    # Parse the command line and cast directory into a pathlib.Path object.
+    args = parser.parse_args()
+    args.simudir = pathlib.Path(args.simudir)
+    args.runsdir = pathlib.Path(args.runsdir)
+    return args
+
+
+args = parse_command_line()
+config, probes, slurm = rodney.load_run_config(args.simudir)
+nprocs = args.nprocs
+if nprocs is None:
+    nprocs = (int(slurm.get('nodes', 1)) *
+              int(slurm.get('ntasks-per-node', 1)))
+
+simudirs = [path.parent for path in args.runsdir.glob('**/config.yaml')]
+cost = rodney.calibrate_cost(simudirs)
+if cost is None:
+    print('No log file found in {}; using the default cost per cell and '
+          'time step'.format(args.runsdir))
+    cost = rodney.COST_PER_CELL_STEP
+
+estimate = rodney.estimate_run_cost(config, probes, nprocs=nprocs,
+                                    cost_per_cell_step=cost)
+rodney.print_run_estimate(estimate)
+
+time_limit = args.time_limit or slurm.get('time')
+try:
+    rodney.check_run_cost(
+        estimate,
+        disk_quota=(args.disk_quota * 2**30
+                    if args.disk_quota is not None else None),
+        memory_per_rank=(args.memory_per_rank * 2**30
+                         if args.memory_per_rank is not None else None),
+        time_limit=(rodney.parse_time_limit(time_limit)
+                    if time_limit is not None else None))
+except ValueError as error:
+    raise SystemExit(str(error))
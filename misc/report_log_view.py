@@ -0,0 +1,56 @@
+"""Report the solver performance of the runs from their PETSc log files.
+
+Each run writes a performance summary with `-log_view ascii:view.log`
+(see the SLURM scripts); the script reports, for each run, the wall time,
+the time per step of the Poisson solve and of the update of the body
+kinematics, and the parallel efficiency relative to runs with the same mesh.
+"""
+
+import argparse
+import pathlib
+
+import rodney
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Report the solver performance from PETSc log files.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('--runs-dir', dest='runsdir',
+                        type=str,
+                        default=str(pathlib.Path(__file__).absolute()
+                                    .parents[1] / 'runs'),
+                        help='Directory with the runs')
+    parser.add_argument('--log-name', dest='logname',
+                        type=str,
+                        default='view.log',
+                        help='Name of the log file in the run directories')
+    parser.add_argument('--stages', dest='stages',
+                        nargs='+', type=str,
+                        default=[],
+                        help='Other logging stages to report')
+    parser.add_argument('--poisson-stage', dest='poisson_stage',
+                        type=str,
+                        default=rodney.POISSON_STAGE,
+                        help='Logging stage of the Poisson solve')
+    parser.add_argument('--kinematics-stage', dest='kinematics_stage',
+                        type=str,
+                        default=rodney.KINEMATICS_STAGE,
+                        help='Logging stage of the kinematics update')
+    # Parse the command line and cast directory into a pathlib.Path object.
+    args = parser.parse_args()
+    args.runsdir = pathlib.Path(args.runsdir)
+    return args
+
+
+args = parse_command_line()
+simudirs = sorted(path.parent for path in args.runsdir.glob('**/config.yaml'))
+reports = rodney.get_log_view_report(simudirs, logname=args.logname,
+                                     poisson_stage=args.poisson_stage,
+                                     kinematics_stage=args.kinematics_stage)
+if not reports:
+    raise SystemExit('No log file {} found in {}'.format(args.logname,
+                                                         args.runsdir))
+rodney.print_log_view_report(reports, stages=args.stages)
@@ -0,0 +1,62 @@
+"""Report the iteration counts of the linear solvers over the flapping cycle.
+
+The iteration counts and final residuals are read from the iterations files
+written by PetIBM in the output folder (`iterations-<nstart>.txt`);
+the script prints their statistics per phase of the flapping cycle.
+"""
+
+import argparse
+import pathlib
+import yaml
+
+import rodney
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Report the iteration counts of the solvers per phase.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('--simu-dir', dest='simudir',
+                        type=str,
+                        default='.',
+                        help='Simulation directory')
+    parser.add_argument('--solvers', dest='solvers',
+                        nargs='+', type=str,
+                        default=['velocity', 'poisson'],
+                        help='Name of the solvers to report')
+    parser.add_argument('--nbins', dest='nbins',
+                        type=int,
+                        default=20,
+                        help='Number of phase bins over the cycle')
+    parser.add_argument('--periods', dest='periods',
+                        nargs=2, type=float,
+                        default=None,
+                        help='Limits of the time interval to consider '
+                             '(in number of periods)')
+    # Parse the command line and cast directory into a pathlib.Path object.
+    args = parser.parse_args()
+    args.simudir = pathlib.Path(args.simudir)
+    return args
+
+
+args = parse_command_line()
+with open(args.simudir / 'config.yaml', 'r') as infile:
+    config = yaml.safe_load(infile)
+dt = config['parameters']['dt']
+period = 1 / config['bodies'][0]['kinematics']['f']
+limits = None
+if args.periods is not None:
+    limits = (args.periods[0] * period, args.periods[1] * period)
+
+datadir = args.simudir / 'output'
+filepaths = sorted(datadir.glob('iterations-*.txt'),
+                   key=lambda path: int(path.stem.split('-')[-1]))
+if not filepaths:
+    raise SystemExit('No iterations file found in {}'.format(datadir))
+histories = rodney.read_iterations(filepaths)
+for name in args.solvers:
+    stats = rodney.get_phase_statistics(histories[name], dt, period,
+                                        nbins=args.nbins, limits=limits)
+    rodney.print_phase_statistics(name, stats)
@@ -0,0 +1,113 @@
+"""Stand-in for the VisIt Python module (nothing is rendered).
+
+The module serves a database with NSTATES states whose time values are
+time-step indices (as in the XDMF files of the runs) and writes a small
+text file (with the process ID) in place of each PNG image, so that the
+VisIt scripts (e.g., `visitplot.visit_render_pool`) can be run and
+checked without VisIt.
+Put the directory of this file on the Python path to use it.
+"""
+
+import os
+
+
+NSTATES = 8  # number of states of the database
+TIMESTEPS = [7750 + 125 * i for i in range(NSTATES)]  # time of the states
+
+_state = {'current': 0, 'query': None, 'save': None}
+
+
+class Attributes(object):
+    """Attributes of a plot, operator, view, or window.
+
+    Unknown attributes (e.g., constants such as PNG, or nested attributes
+    such as axes3D) are created on access.
+    """
+
+    def __getattr__(self, name):
+        """Create a missing attribute."""
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = Attributes()
+        setattr(self, name, value)
+        return value
+
+
+def _attributes(*args):
+    """Create attributes (arguments are ignored)."""
+    return Attributes()
+
+
+AnnotationAttributes = ContourAttributes = IsosurfaceAttributes = _attributes
+PseudocolorAttributes = RenderingAttributes = _attributes
+View2DAttributes = View3DAttributes = SaveWindowAttributes = _attributes
+
+
+def _ignore(*args, **kwargs):
+    """Accept the call and do nothing."""
+    return 1
+
+
+AddOperator = AddPlot = DrawPlots = OpenDatabase = _ignore
+SetAnnotationAttributes = SetOperatorOptions = SetPlotOptions = _ignore
+SetRenderingAttributes = SetView3D = Source = ToggleCameraViewMode = _ignore
+Close = CloseComputeEngine = _ignore
+
+
+def LaunchNowin():
+    """Launch the (fake) viewer; VisIt writes a log file in the cwd."""
+    open('visitlog.py', 'w').close()
+    return 1
+
+
+def Version():
+    """Return the version of VisIt used to create the scripts."""
+    return '2.12.1'
+
+
+def TimeSliderGetNStates():
+    """Return the number of states of the database."""
+    return NSTATES
+
+
+def SetTimeSliderState(state):
+    """Set the current state."""
+    if not 0 <= state < NSTATES:
+        raise ValueError('Invalid state {}'.format(state))
+    _state['current'] = state
+    return 1
+
+
+def Query(name):
+    """Query a value of the current state (only 'Time' is supported)."""
+    if name != 'Time':
+        raise ValueError('Unsupported query {}'.format(name))
+    _state['query'] = float(TIMESTEPS[_state['current']])
+    return 1
+
+
+def GetQueryOutputValue():
+    """Return the value of the last query."""
+    return _state['query']
+
+
+def GetMetaData(db):
+    """Return the metadata of the database (time values of the states)."""
+    metadata = Attributes()
+    metadata.times = tuple(float(timestep) for timestep in TIMESTEPS)
+    return metadata
+
+
+def SetSaveWindowAttributes(atts):
+    """Set the attributes to save the window."""
+    _state['save'] = atts
+    return 1
+
+
+def SaveWindow():
+    """Write a text file in place of the PNG image of the window."""
+    atts = _state['save']
+    filepath = os.path.join(atts.outputDirectory, atts.fileName + '.png')
+    with open(filepath, 'w') as outfile:
+        outfile.write('{}\n'.format(os.getpid()))
+    return filepath
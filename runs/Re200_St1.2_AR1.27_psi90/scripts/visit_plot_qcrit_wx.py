@@ -34,12 +34,12 @@ view3 = View(label='perspective',
              figsize=(850, 630))
 views = [view1, view2, view3]
 
-for view in views:
-    prefix = 'qcrit_wx_{}_view_'.format(view.label)
-    visitplot.visit_plot_qcrit_wx_3d(xdmf_path,
-                                     qcrit_vals=(6.0, 1.0),
-                                     wx_lims=(-5.0, 5.0),
-                                     config_view=view.path,
-                                     out_dir=figdir, prefix=prefix,
-                                     figsize=view.figsize,
-                                     state=17)
+# Render all the views in a single VisIt session.
+with visitplot.VisItSession(xdmf_path, out_dir=figdir) as session:
+    session.add_qcrit_wx_plots(qcrit_vals=(6.0, 1.0), wx_lims=(-5.0, 5.0))
+    states = [session.get_state(8500)]  # time step 8500
+    jobs = [visitplot.RenderJob(config_view=view.path, states=states,
+                                prefix='qcrit_wx_{}_view_'.format(view.label),
+                                figsize=view.figsize)
+            for view in views]
+    session.render(jobs)
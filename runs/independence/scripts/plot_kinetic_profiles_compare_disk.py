@@ -3,7 +3,6 @@
 from matplotlib import pyplot
 import numpy
 import pathlib
-from scipy import interpolate
 
 import rodney
 
@@ -30,26 +29,23 @@ def get_kinetic_energy_profiles(datadir, config, xlocs):
     profiles['locs'] = y_ref
 
     for iloc, xloc in enumerate(xlocs):
-        kin = numpy.zeros_like(y_ref)
+        stats = []
         for name in ('u', 'v', 'w'):
             filepath = datadir / f'probe{iloc + 1}-{name}-kin.h5'
 
-            # Get the profile at each time values.
-            series = []
-            for time in times:
-                y, vals = rodney.get_vertical_profile_xy(filepath, name,
-                                                         time, xloc, S / 2)
-                vals = interpolate.interpn((y,), vals, y_ref)
-                series.append(vals)
-            series = numpy.array(series)
-
-            # Compute the mean velocity profile.
-            avg = numpy.mean(series, axis=0)
-
-            # Update the fluctuation of the kinetic energy
-            # with the average of the fluctuation of the velocity component.
-            kin += 0.5 * numpy.mean((series - avg)**2, axis=0)
-
+            # Accumulate the statistics of the profile chunk by chunk
+            # (profiles are resampled at the reference y locations).
+            stats.append(rodney.RunningStatistics())
+            with rodney.ProbeReader(filepath, name) as probe:
+                chunks = probe.iter_chunks((times[0], times[-1]))
+                for _, values in chunks:
+                    _, series = rodney.get_vertical_profiles_xy(
+                        values, probe.grid, [xloc], S / 2, ylocs=y_ref)
+                    stats[-1].update(series[:, 0])
+
+        # Compute the fluctuation of the kinetic energy
+        # from the variance of the velocity components.
+        kin = rodney.get_kinetic_energy_fluctuation(*stats)
         profiles['vals'].append(kin)
 
     return profiles
@@ -0,0 +1,76 @@
+"""Generate the figures of all runs with a dependency-graph task runner.
+
+The stages (scripts) and their inputs are read from misc/repro-packs.yaml.
+Independent stages (e.g., from different runs) run in parallel;
+figures newer than their inputs are not regenerated.
+"""
+
+import argparse
+import pathlib
+
+import rodney
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'Generate the figures of all runs.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('targets',
+                        nargs='*', type=str,
+                        help='Glob patterns of the figures to generate '
+                             '(e.g., "Re100*/*" or "*force_coefficients*"; '
+                             'default: all figures)')
+    parser.add_argument('--dry-run', dest='dry_run',
+                        action='store_true',
+                        help='Only print the stages to run')
+    parser.add_argument('--force', dest='force',
+                        action='store_true',
+                        help='Regenerate figures that are up to date')
+    parser.add_argument('--max-workers', dest='max_workers',
+                        type=int,
+                        default=None,
+                        help='Maximum number of processes of the running '
+                             'stages (default: number of CPUs)')
+    parser.add_argument('--field-workers', dest='field_workers',
+                        type=int,
+                        default=2,
+                        help='Number of processes of each script computing '
+                             '3D fields (compute_*.py)')
+    parser.add_argument('--max-memory', dest='max_memory',
+                        type=float,
+                        default=None,
+                        help='Maximum estimated memory (GiB) of the '
+                             'running stages (default: no limit)')
+    parser.add_argument('--visit-python', dest='visit_python',
+                        nargs='+', type=str,
+                        default=['conda', 'run', '-n', 'py27-visit',
+                                 'python'],
+                        help='Command to run the VisIt scripts')
+    return parser.parse_args()
+
+
+args = parse_command_line()
+rootdir = pathlib.Path(__file__).absolute().parents[1]
+filepath = rootdir.parent / 'misc' / 'repro-packs.yaml'
+
+# Estimated memory (GiB) per process of the stages; the post-processing of
+# the 3D fields loads the velocity components of a snapshot (21M cells).
+memory = {'compute_*.py': 6.0,
+          'get_wx_distances.py': 4.0,
+          'plot_*_slices.py': 4.0,
+          'visit_*.py': 4.0}
+
+stages, targets = rodney.load_targets(
+    filepath, rootdir, interpreters={'visit_*.py': args.visit_python},
+    memory=memory, workers={'compute_*.py': args.field_workers})
+names = rodney.select_stages(stages, targets, patterns=args.targets,
+                             force=args.force)
+if not names:
+    print('All figures are up to date.')
+status = rodney.run_stages(stages, names, max_workers=args.max_workers,
+                           max_memory=args.max_memory, dry_run=args.dry_run)
+failed = [name for name, value in status.items() if value == 'failed']
+if failed:
+    raise SystemExit('Failed stages: {}'.format(', '.join(failed)))
@@ -0,0 +1,70 @@
+"""List the field snapshots available in the output folder of runs.
+
+The snapshots are discovered through the index of rodney.snapshots
+(output/snapshots.json), which is refreshed incrementally.
+"""
+
+import argparse
+import pathlib
+
+import rodney
+
+
+def parse_command_line():
+    """Parse the command-line options."""
+    formatter_class = argparse.ArgumentDefaultsHelpFormatter
+    descr = 'List the field snapshots of runs.'
+    parser = argparse.ArgumentParser(description=descr,
+                                     formatter_class=formatter_class)
+    parser.add_argument('runs',
+                        nargs='*', type=str,
+                        help='Glob patterns of the run directories '
+                             '(e.g., "Re200_*"; default: all runs)')
+    parser.add_argument('--names', dest='names',
+                        nargs='+', type=str,
+                        default=None,
+                        help='Datasets that the snapshots must contain '
+                             '(e.g., wx)')
+    parser.add_argument('--start', dest='start',
+                        type=int,
+                        default=None,
+                        help='First time-step index')
+    parser.add_argument('--end', dest='end',
+                        type=int,
+                        default=None,
+                        help='Last time-step index')
+    parser.add_argument('--stride', dest='stride',
+                        type=int,
+                        default=1,
+                        help='Keep every stride-th snapshot')
+    parser.add_argument('--period', dest='period',
+                        type=float,
+                        default=None,
+                        help='Period of the cycle (to select by phase)')
+    parser.add_argument('--phases', dest='phases',
+                        nargs='+', type=float,
+                        default=None,
+                        help='Phases to select (fraction of the period)')
+    return parser.parse_args()
+
+
+args = parse_command_line()
+rootdir = pathlib.Path(__file__).absolute().parents[1]
+patterns = args.runs or ['*']
+
+simudirs = sorted({simudir for pattern in patterns
+                   for simudir in rootdir.glob(pattern)
+                   if (simudir / 'output').is_dir()})
+if not simudirs:
+    print('No run with an output folder.')
+for simudir in simudirs:
+    config, _, _ = rodney.load_run_config(simudir)
+    snapshots = rodney.get_snapshot_index(simudir / 'output',
+                                          dt=config['parameters']['dt'])
+    snapshots = rodney.select_snapshots(
+        snapshots, names=args.names, start=args.start, end=args.end,
+        stride=args.stride, period=args.period, phases=args.phases)
+    print('[{}] {} snapshots'.format(simudir.name, len(snapshots)))
+    for snapshot in snapshots:
+        print('{:>7d} {:>10.4f} {}'.format(snapshot.timestep, snapshot.time,
+                                           ' '.join(snapshot.datasets)))
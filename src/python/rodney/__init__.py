@@ -1,5 +1,16 @@
+from .averaging import *
+from .efficiency import *
+from .fields import *
 from .forces import *
+from .interpolation import *
 from .lidong2016 import *
+from .logview import *
+from .manifest import *
+from .mesh import *
 from .misc import *
+from .preflight import *
 from .profiles import *
+from .snapshots import *
+from .solvers import *
+from .tasks import *
 from .wing import *
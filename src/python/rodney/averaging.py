@@ -0,0 +1,407 @@
+"""Streaming and phase-averaged statistics of time series and probe data."""
+
+import collections
+import numpy
+from scipy import sparse
+
+
+PhaseAverage = collections.namedtuple('PhaseAverage',
+                                      ['phase', 'mean', 'std', 'count'])
+CycleStats = collections.namedtuple('CycleStats',
+                                    ['cycle', 'mean', 'rms', 'min', 'max'])
+Convergence = collections.namedtuple('Convergence',
+                                     ['cycle', 'mean_change', 'phase_change'])
+
+
+def _merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b):
+    """Merge the count, mean, and sum of squared deviations of two sets.
+
+    Pairwise update of Chan et al.; the counts can be arrays (e.g., one
+    per phase bin) that broadcast against the means, and empty sets
+    (with zero mean) leave the other one unchanged.
+    """
+    count = count_a + count_b
+    n = numpy.maximum(count, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (count_b / n)
+    m2 = m2_a + m2_b + delta**2 * (count_a * count_b / n)
+    return count, mean, m2
+
+
+class RunningStatistics(object):
+    """Streaming mean, variance, and covariance (Welford/Chan algorithm).
+
+    Samples are consumed chunk by chunk along the first axis, so a time
+    series never needs to be held in memory at once.
+    Partial statistics (e.g., computed in parallel over time chunks) can be
+    combined with `merge`.
+
+    Parameters
+    ----------
+    covariance : bool, optional
+        If True, samples have shape (nvar, ...) and the covariance matrix
+        between the nvar variables is also accumulated; default is False.
+
+    """
+
+    def __init__(self, covariance=False):
+        """Initialize empty statistics."""
+        self.track_covariance = covariance
+        self.count = 0
+        self.mean = None
+        self.m2 = None  # sum of squared deviations from the mean
+        self.c2 = None  # sum of products of deviations from the means
+
+    def __repr__(self):
+        """Set object representation."""
+        shape = None if self.mean is None else self.mean.shape
+        return f'RunningStatistics(count={self.count}, shape={shape})'
+
+    def _combine(self, count, mean, m2, c2):
+        """Combine the current statistics with the ones of another set."""
+        if count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.c2 = count, mean, m2, c2
+            return
+        if self.track_covariance:
+            delta = mean - self.mean
+            outer = delta[:, None] * delta[None, :]
+            factor = self.count * count / (self.count + count)
+            self.c2 = self.c2 + c2 + outer * factor
+        self.count, self.mean, self.m2 = _merge_moments(
+            self.count, self.mean, self.m2, count, mean, m2)
+
+    def update(self, values):
+        """Update the statistics with a chunk of samples.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            Samples as an array of floats with shape (n, ...), or
+            (n, nvar, ...) when the covariance is tracked.
+
+        """
+        values = numpy.asarray(values, dtype=float)
+        count = values.shape[0]
+        if count == 0:
+            return
+        mean = numpy.mean(values, axis=0)
+        dev = values - mean
+        m2 = numpy.sum(dev**2, axis=0)
+        c2 = None
+        if self.track_covariance:
+            c2 = numpy.einsum('na...,nb...->ab...', dev, dev)
+        self._combine(count, mean, m2, c2)
+
+    def merge(self, other):
+        """Merge statistics computed on another set of samples.
+
+        Parameters
+        ----------
+        other : RunningStatistics
+            Statistics to merge into the present ones.
+
+        Returns
+        -------
+        RunningStatistics
+            The present (updated) statistics.
+
+        """
+        self._combine(other.count, other.mean, other.m2, other.c2)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance of the samples (ddof=0)."""
+        return self.m2 / self.count
+
+    @property
+    def std(self):
+        """Population standard deviation of the samples (ddof=0)."""
+        return numpy.sqrt(self.variance)
+
+    @property
+    def covariance(self):
+        """Population covariance matrix of the variables (nvar, nvar, ...)."""
+        assert self.track_covariance, 'Covariance is not tracked'
+        return self.c2 / self.count
+
+
+def get_kinetic_energy_fluctuation(*stats):
+    """Return the fluctuation of the kinetic energy.
+
+    k' = 0.5 * < u'^2 + v'^2 + w'^2 > computed from the statistics of each
+    velocity component.
+
+    Parameters
+    ----------
+    stats : RunningStatistics
+        Statistics of the velocity components.
+
+    Returns
+    -------
+    numpy.ndarray
+        Fluctuation of the kinetic energy.
+
+    """
+    return 0.5 * sum(s.variance for s in stats)
+
+
+def get_phase_bins(t, nbins, period=1.0, t0=0.0):
+    """Return the cycle index and the phase bin of each time value.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values as a 1D array of floats.
+    nbins : int
+        Number of phase bins per cycle.
+    period : float, optional
+        Period of the cycle; default is 1.0 (time already normalized).
+    t0 : float, optional
+        Time value at the start of the first cycle; default is 0.0.
+
+    Returns
+    -------
+    numpy.ndarray
+        Cycle indices as a 1D array of integers.
+    numpy.ndarray
+        Phase-bin indices (in [0, nbins)) as a 1D array of integers.
+
+    """
+    # Position in units of bins, snapped to the bin edges within round-off
+    # (time values on an edge, e.g. from an integral number of time steps
+    # per bin, would otherwise be binned on either side of the edge).
+    x = (numpy.asarray(t, dtype=float) - t0) / period * nbins
+    edges = numpy.round(x)
+    x = numpy.where(numpy.isclose(x, edges, rtol=1e-9, atol=1e-9), edges, x)
+    index = numpy.floor(x).astype(int)
+    return index // nbins, index % nbins
+
+
+def _bin_sums(bins, values, nbins):
+    """Return the sum of the values in each bin."""
+    if values.ndim == 1:
+        return numpy.bincount(bins, weights=values, minlength=nbins)
+    # Sparse one-hot matrix (nbins, n): one multiply-add per sample.
+    n = bins.size
+    onehot = sparse.csr_matrix((numpy.ones(n), (bins, numpy.arange(n))),
+                               shape=(nbins, n))
+    flat = values.reshape(n, -1)
+    shape = (nbins,) + values.shape[1:]
+    return numpy.asarray(onehot @ flat).reshape(shape)
+
+
+def _bin_moments(bins, values, nbins):
+    """Return the count, mean, and sum of squared deviations in each bin.
+
+    The deviations are taken from the mean of each bin (two passes),
+    so the variance does not lose precision when the mean is large;
+    empty bins get a zero mean.
+    """
+    count = numpy.bincount(bins, minlength=nbins)
+    shape = (nbins,) + (1,) * (values.ndim - 1)
+    n = numpy.maximum(count, 1).reshape(shape)
+    mean = _bin_sums(bins, values, nbins) / n
+    m2 = _bin_sums(bins, (values - mean[bins])**2, nbins)
+    return count.reshape(shape), mean, m2
+
+
+def _get_phase_average(count, mean, m2, nbins):
+    """Return the phase average from the moments in each bin."""
+    phase = (numpy.arange(nbins) + 0.5) / nbins
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        mean = numpy.where(count > 0, mean, numpy.nan)
+        std = numpy.sqrt(m2 / count)
+    return PhaseAverage(phase=phase, mean=mean, std=std,
+                        count=count.ravel())
+
+
+def get_phase_average(t, values, nbins=100, period=1.0, t0=0.0,
+                      limits=(-numpy.infty, numpy.infty)):
+    """Compute the phase-locked average of a time series.
+
+    Samples are binned by phase (t - t0) / period mod 1 in a single O(n)
+    pass; bins without samples get NaN.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values as a 1D array of floats.
+    values : numpy.ndarray
+        Samples as an array of floats with shape (n,) or (n, ...).
+    nbins : int, optional
+        Number of phase bins per cycle; default is 100.
+    period : float, optional
+        Period of the cycle; default is 1.0 (time already normalized).
+    t0 : float, optional
+        Time value at the start of the first cycle; default is 0.0.
+    limits : tuple of floats, optional
+        Time interval to consider; default is (-inf, +inf).
+
+    Returns
+    -------
+    PhaseAverage
+        Named tuple with the phase at the center of the bins,
+        the phase-averaged mean and standard deviation,
+        and the number of samples in each bin.
+
+    """
+    t = numpy.asarray(t, dtype=float)
+    values = numpy.asarray(values, dtype=float)
+    mask = (t >= limits[0]) & (t <= limits[1])
+    _, bins = get_phase_bins(t[mask], nbins, period=period, t0=t0)
+    moments = _bin_moments(bins, values[mask], nbins)
+    return _get_phase_average(*moments, nbins)
+
+
+def get_cycle_statistics(t, values, period=1.0, t0=0.0, complete=True):
+    """Compute the mean, rms, minimum, and maximum over each cycle.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values as a 1D array of increasing floats.
+    values : numpy.ndarray
+        Samples as a 1D array of floats.
+    period : float, optional
+        Period of the cycle; default is 1.0 (time already normalized).
+    t0 : float, optional
+        Time value at the start of the first cycle; default is 0.0.
+    complete : bool, optional
+        If True, the last cycle is discarded when incomplete;
+        default is True.
+
+    Returns
+    -------
+    CycleStats
+        Named tuple with the cycle indices and the mean, rms (of the
+        fluctuations around the cycle mean), minimum, and maximum values
+        over each cycle.
+
+    """
+    t = numpy.asarray(t, dtype=float)
+    values = numpy.asarray(values, dtype=float)
+    cycle = numpy.floor((t - t0) / period).astype(int)
+    # Samples are sorted in time: each cycle is a contiguous slice.
+    cycles, starts = numpy.unique(cycle, return_index=True)
+    if complete and t.size > 1:
+        # The last cycle is complete if its last sample is within
+        # one sampling interval from the end of the cycle.
+        h = numpy.median(numpy.diff(t))
+        end = t0 + (cycles[-1] + 1) * period
+        if t[-1] < end - 1.5 * h:
+            values = values[:starts[-1]]
+            cycles, starts = cycles[:-1], starts[:-1]
+    count = numpy.diff(numpy.append(starts, values.size))
+    mean = numpy.add.reduceat(values, starts) / count
+    # Fluctuations around the mean of each cycle (two passes).
+    dev = values - numpy.repeat(mean, count)
+    rms = numpy.sqrt(numpy.add.reduceat(dev**2, starts) / count)
+    vmin = numpy.minimum.reduceat(values, starts)
+    vmax = numpy.maximum.reduceat(values, starts)
+    return CycleStats(cycle=cycles, mean=mean, rms=rms, min=vmin, max=vmax)
+
+
+def get_cycle_convergence(t, values, nbins=100, period=1.0, t0=0.0):
+    """Compute cycle-to-cycle convergence metrics of a periodic signal.
+
+    For each cycle (from the second one), the function returns the
+    change of the cycle-averaged value and the rms difference between
+    the phase-averaged curves of the cycle and of the previous one,
+    both relative to the rms of the phase-averaged curve of the cycle.
+    Cycles without samples in every phase bin (e.g., an incomplete last
+    cycle) are ignored.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values as a 1D array of increasing floats.
+    values : numpy.ndarray
+        Samples as a 1D array of floats.
+    nbins : int, optional
+        Number of phase bins per cycle; default is 100.
+    period : float, optional
+        Period of the cycle; default is 1.0 (time already normalized).
+    t0 : float, optional
+        Time value at the start of the first cycle; default is 0.0.
+
+    Returns
+    -------
+    Convergence
+        Named tuple with the cycle indices, the relative change of the
+        cycle mean, and the relative change of the phase-averaged curve.
+
+    """
+    values = numpy.asarray(values, dtype=float)
+    cycle, bins = get_phase_bins(t, nbins, period=period, t0=t0)
+    cycles = numpy.unique(cycle)
+    idx = numpy.searchsorted(cycles, cycle) * nbins + bins
+    size = cycles.size * nbins
+    count = numpy.bincount(idx, minlength=size).reshape(-1, nbins)
+    total = numpy.bincount(idx, weights=values,
+                           minlength=size).reshape(-1, nbins)
+    # Only keep cycles with samples in all phase bins.
+    full = numpy.all(count > 0, axis=1)
+    cycles = cycles[full]
+    curves = total[full] / count[full]  # phase-averaged curve of each cycle
+    means = numpy.mean(curves, axis=1)
+    scale = numpy.sqrt(numpy.mean(curves**2, axis=1))
+    mean_change = numpy.abs(numpy.diff(means)) / scale[1:]
+    phase_change = (numpy.sqrt(numpy.mean(numpy.diff(curves, axis=0)**2,
+                                          axis=1)) / scale[1:])
+    return Convergence(cycle=cycles[1:], mean_change=mean_change,
+                       phase_change=phase_change)
+
+
+def get_phase_averaged_probe(reader, period, nbins=20, t0=0.0,
+                             time_limits=None, chunk_size=100):
+    """Compute the phase-averaged field of a volume probe.
+
+    Records are streamed chunk by chunk; only the count, mean, and sum of
+    squared deviations of each bin are stored (merged across chunks).
+
+    Parameters
+    ----------
+    reader : rodney.ProbeReader
+        Reader of the volume probe.
+    period : float
+        Period of the cycle.
+    nbins : int, optional
+        Number of phase bins per cycle; default is 20.
+    t0 : float, optional
+        Time value at the start of the first cycle; default is 0.0.
+    time_limits : tuple of floats, optional
+        Time window to consider; default is None (all records).
+    chunk_size : int, optional
+        Number of records per chunk; default is 100.
+
+    Returns
+    -------
+    PhaseAverage
+        Named tuple with the phase at the center of the bins,
+        the phase-averaged field and its standard deviation
+        (arrays with shape (nbins, ...)), and the number of records
+        in each bin.
+
+    Raises
+    ------
+    ValueError
+        If no record is found in the time window.
+
+    """
+    moments = None
+    chunks = reader.iter_chunks(time_limits=time_limits,
+                                chunk_size=chunk_size)
+    for times, values in chunks:
+        _, bins = get_phase_bins(times, nbins, period=period, t0=t0)
+        chunk_moments = _bin_moments(bins, values, nbins)
+        if moments is None:
+            moments = chunk_moments
+        else:
+            moments = _merge_moments(*moments, *chunk_moments)
+    if moments is None:
+        raise ValueError('No record of the probe in the time window {}'
+                         .format(time_limits))
+    return _get_phase_average(*moments, nbins)
@@ -0,0 +1,196 @@
+"""Functions to compute the hydrodynamic power and propulsive efficiency."""
+
+import collections
+import h5py
+import numpy
+
+import petibmpy
+
+from .interpolation import TrilinearInterpolator
+
+
+Efficiency = collections.namedtuple('Efficiency',
+                                    ['thrust', 'ct', 'times', 'P_hydro',
+                                     'P_hydro_avg', 'eta'])
+
+
+def load_probe_times(filepath, name='p'):
+    """Return the time values recorded in a HDF5 volume probe.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file with the volume probe data.
+    name : str, optional
+        Name of the recorded variable; default is 'p'.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted time values as a 1D array of floats.
+    list of str
+        Names of the HDF5 datasets (sorted as the time values).
+
+    """
+    with h5py.File(filepath, 'r') as infile:
+        keys = list(infile[name].keys())
+    keys = sorted(keys, key=float)
+    times = numpy.array([float(key) for key in keys])
+    return times, keys
+
+
+def set_virtual_boundary(wing, d):
+    """Replace the flat surface of the wing with a virtual boundary.
+
+    The flat surface is extended by a distance d on the lower and upper
+    sides; the first half of the markers is on the lower side, the second
+    half on the upper side.
+
+    Parameters
+    ----------
+    wing : rodney.WingKinematics
+        Kinematics of the wing (with the original flat body loaded).
+    d : float
+        Normal distance from the original markers.
+
+    """
+    x0, y0, z0 = wing.get_coordinates(org=True)
+    xv0 = numpy.tile(x0, 2)
+    yv0 = numpy.concatenate((y0 - d, y0 + d))
+    zv0 = numpy.tile(z0, 2)
+    wing.set_coordinates(xv0, yv0, zv0, org=True)
+
+
+def compute_hydrodynamic_power(p, n, u, ds):
+    """Compute the hydrodynamic power.
+
+    Parameters
+    ----------
+    p : numpy.ndarray
+        Pressure on the markers as an array of floats with shape (..., N).
+    n : numpy.ndarray
+        Outward unit normals as an array of floats with shape (..., N, 3).
+    u : numpy.ndarray
+        Velocity of the markers as an array of floats with shape (..., N, 3).
+    ds : float
+        Surface area associated with each marker.
+
+    Returns
+    -------
+    float or numpy.ndarray
+        Hydrodynamic power (one value per leading index).
+
+    """
+    return numpy.sum(p * numpy.einsum('...i,...i->...', n, u), axis=-1) * ds
+
+
+def compute_propulsive_efficiency(wing, datadir, d=0.03, ds=None,
+                                  time_limits=None,
+                                  probe_name='probe_vicinity-p',
+                                  chunk_size=50):
+    """Compute the cycle-averaged thrust, hydrodynamic power, and efficiency.
+
+    The pressure records of the volume probe are streamed chunk by chunk
+    (the HDF5 file is opened once) and interpolated on a virtual boundary
+    surrounding the wing with a cached trilinear stencil.
+    Positions, velocities, and normals of the virtual markers are computed
+    for all time values of a chunk at once.
+
+    Parameters
+    ----------
+    wing : rodney.WingKinematics
+        Kinematics of the wing (with the original flat body loaded);
+        the body is replaced with the virtual boundary.
+    datadir : pathlib.Path
+        Directory with the forces and the probe data.
+    d : float, optional
+        Normal distance between the virtual boundary and the wing;
+        default is 0.03.
+    ds : float, optional
+        Surface area associated with each marker;
+        default is None (planform area divided by the number of markers).
+    time_limits : tuple of floats, optional
+        Time interval used to average the thrust;
+        default is None (last flapping period).
+    probe_name : str, optional
+        Name of the volume probe with the pressure;
+        default is 'probe_vicinity-p'.
+    chunk_size : int, optional
+        Number of time records processed at once; default is 50.
+
+    Returns
+    -------
+    Efficiency
+        Named tuple with the cycle-averaged thrust and thrust coefficient,
+        the probe times, the hydrodynamic power at those times,
+        the cycle-averaged hydrodynamic power, and the propulsive efficiency.
+
+    """
+    # Compute the cycle-averaged thrust and thrust coefficient.
+    if time_limits is None:
+        time_limits = ((wing.n_periods - 1) * wing.T, wing.n_periods * wing.T)
+    t, fx, _, _ = petibmpy.read_forces(datadir / 'forces-0.txt')
+    thrust = -fx  # switch from drag to thrust
+    thrust_avg, = petibmpy.get_time_averaged_values(t, thrust,
+                                                    limits=time_limits)
+    scale = 1 / (0.5 * wing.rho * wing.U_inf**2 * wing.A_plan)
+    ct, = petibmpy.get_force_coefficients(thrust, coeff=scale)
+    ct_avg, = petibmpy.get_time_averaged_values(t, ct, limits=time_limits)
+
+    # Surround the wing with the virtual boundary.
+    if ds is None:
+        ds = wing.A_plan / wing.size
+    set_virtual_boundary(wing, d)
+
+    # Stream the pressure records and compute the hydrodynamic power.
+    filepath = datadir / (probe_name + '.h5')
+    times, keys = load_probe_times(filepath, name='p')
+    P_hydro = numpy.empty_like(times)
+    with h5py.File(filepath, 'r') as infile:
+        grid = tuple(infile['mesh'][dim][:] for dim in ('x', 'y', 'z'))
+        group = infile['p']
+        values = numpy.empty(group[keys[0]].shape)
+        interpolator = TrilinearInterpolator(grid)
+        states = wing.iter_states(times, chunk_size=chunk_size)
+        for start, state in zip(range(0, times.size, chunk_size), states):
+            p = numpy.empty(state.x.shape[:-1])
+            for i, key in enumerate(keys[start:start + state.t.size]):
+                group[key].read_direct(values)
+                # Only markers that crossed into a new cell are searched.
+                interpolator.update_points(state.x[i])
+                p[i] = interpolator(values)
+            P_hydro[start:start + state.t.size] = compute_hydrodynamic_power(
+                p, state.n, state.u, ds)
+
+    # Compute the cycle-averaged hydrdynamic power.
+    # As in Li & Dong (2016), only positive values are considered.
+    P_hydro_avg = numpy.mean(P_hydro[P_hydro > 0.0])
+
+    # Compute the propulsive efficiency.
+    eta = thrust_avg * wing.U_inf / P_hydro_avg
+
+    return Efficiency(thrust=thrust_avg, ct=ct_avg, times=times,
+                      P_hydro=P_hydro, P_hydro_avg=P_hydro_avg, eta=eta)
+
+
+def write_hydrodynamic_power(filepath, efficiency):
+    """Write the history of the hydrodynamic power into a file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the output file.
+    efficiency : Efficiency
+        Named tuple with the time values and the hydrodynamic power.
+
+    """
+    with open(filepath, 'w') as outfile:
+        numpy.savetxt(outfile, numpy.c_[efficiency.times, efficiency.P_hydro])
+
+
+def print_efficiency(efficiency):
+    """Print the cycle-averaged quantities and the propulsive efficiency."""
+    print('Cycle-averaged thrust:', efficiency.thrust)
+    print('Cycle-averaged thrust coefficient:', efficiency.ct)
+    print('Cycle-averaged hydrodynamic power:', efficiency.P_hydro_avg)
+    print('Propulsive efficiency:', efficiency.eta)
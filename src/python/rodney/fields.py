@@ -0,0 +1,768 @@
+"""Functions to post-process the 3D field solutions (e.g., Q-criterion)."""
+
+import concurrent.futures
+import h5py
+import numpy
+import os
+import pathlib
+
+import petibmpy
+
+from .interpolation import interpolate_rectilinear
+from .manifest import Manifest
+
+
+# Environment variable with the default number of processes of the pools
+# (set by the task runner, which counts them in its limits).
+MAX_WORKERS_ENV = 'RODNEY_MAX_WORKERS'
+
+
+def get_slabs(nz, slab_size, offset=0):
+    """Return the limits of the slabs that split the z direction.
+
+    Parameters
+    ----------
+    nz : int
+        Number of points along the z direction.
+    slab_size : int
+        Maximum number of points in a slab.
+    offset : int, optional
+        Index of the first point; default is 0.
+
+    Returns
+    -------
+    list of tuple of ints
+        Start (included) and end (excluded) indices of the slabs.
+
+    """
+    return [(offset + start, offset + min(start + slab_size, nz))
+            for start in range(0, nz, slab_size)]
+
+
+def get_halo_limits(start, end, n, halo=1):
+    """Return the limits of a slab extended with halo points."""
+    return max(start - halo, 0), min(end + halo, n)
+
+
+def get_box_limits(grid, box=None):
+    """Return the index limits of the grid points inside a box.
+
+    Parameters
+    ----------
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z).
+    box : tuple of floats, optional
+        Limits of the box (xstart, xend, ystart, yend, zstart, zend);
+        default is None (the entire grid).
+
+    Returns
+    -------
+    tuple of tuple of ints
+        Start (included) and end (excluded) indices along x, y, and z.
+
+    """
+    if box is None:
+        return tuple((0, gridline.size) for gridline in grid)
+    limits = []
+    for gridline, start, end in zip(grid, box[::2], box[1::2]):
+        i0 = numpy.searchsorted(gridline, start, side='left')
+        i1 = numpy.searchsorted(gridline, end, side='right')
+        if i1 <= i0:
+            raise ValueError('No grid point inside the box {}'.format(box))
+        limits.append((int(i0), int(i1)))
+    return tuple(limits)
+
+
+def crop_grid(grid, limits):
+    """Return the gridlines cropped to index limits."""
+    return tuple(gridline[start:end]
+                 for gridline, (start, end) in zip(grid, limits))
+
+
+def read_field_slab(filepath, name, start, end):
+    """Read the z-slab [start, end) of a field from a HDF5 file."""
+    with h5py.File(filepath, 'r') as infile:
+        return infile[name][start:end]
+
+
+def get_bracketing_limits(x, xstart, xend):
+    """Return the limits of the points of x bracketing [xstart, xend]."""
+    start = max(numpy.searchsorted(x, xstart, side='right') - 1, 0)
+    end = min(numpy.searchsorted(x, xend, side='left') + 1, x.size)
+    # Keep at least two points to interpolate (or extrapolate).
+    start, end = min(start, x.size - 2), max(end, 2)
+    return start, end
+
+
+def read_cell_centered_field(infile, name, grid_from, grid):
+    """Read and interpolate a field on a block of the cell-centered grid.
+
+    Only the hyperslab of the field that brackets the cell-centered block
+    is read from file.
+
+    Parameters
+    ----------
+    infile : h5py.File
+        HDF5 file with the field.
+    name : str
+        Name of the field.
+    grid_from : tuple of numpy.ndarray
+        Grid of the field (x, y, z).
+    grid : tuple of numpy.ndarray
+        Gridlines (x, y, z) of the cell-centered block.
+
+    Returns
+    -------
+    numpy.ndarray
+        Field on the cell-centered block.
+
+    """
+    limits = [get_bracketing_limits(gridline_from, gridline[0], gridline[-1])
+              for gridline_from, gridline in zip(grid_from, grid)]
+    (i0, i1), (j0, j1), (k0, k1) = limits
+    field = infile[name][k0:k1, j0:j1, i0:i1]
+    return interpolate_rectilinear(field, crop_grid(grid_from, limits), grid)
+
+
+def read_cell_centered_velocity(filepath, grids, grid):
+    """Read and interpolate the velocity on a block of the cell-centered grid.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the HDF5 file with the velocity components.
+    grids : dict
+        Grids of the velocity components (keys 'u', 'v', and 'w').
+    grid : tuple of numpy.ndarray
+        Gridlines (x, y, z) of the cell-centered block.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Velocity components on the cell-centered block.
+
+    """
+    with h5py.File(filepath, 'r') as infile:
+        return tuple(read_cell_centered_field(infile, name, grids[name], grid)
+                     for name in ('u', 'v', 'w'))
+
+
+def compute_velocity_gradient(velocity, grid):
+    """Compute the velocity-gradient tensor with second-order differences.
+
+    Parameters
+    ----------
+    velocity : tuple of numpy.ndarray
+        Velocity components (u, v, w) with shape (nz, ny, nx).
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z).
+
+    Returns
+    -------
+    numpy.ndarray
+        Velocity-gradient tensor with shape (3, 3, nz, ny, nx);
+        A[i, j] = du_i / dx_j.
+
+    """
+    x, y, z = grid
+    A = numpy.empty((3, 3) + velocity[0].shape)
+    for i, component in enumerate(velocity):
+        ddz, ddy, ddx = numpy.gradient(component, z, y, x)
+        A[i, 0], A[i, 1], A[i, 2] = ddx, ddy, ddz
+    return A
+
+
+def get_qcriterion(A):
+    """Return the Q-criterion from the velocity-gradient tensor.
+
+    Q = 0.5 * (||Omega||^2 - ||S||^2) = -0.5 * A_ij A_ji.
+
+    """
+    qcrit = -0.5 * (A[0, 0]**2 + A[1, 1]**2 + A[2, 2]**2)
+    qcrit -= A[0, 1] * A[1, 0] + A[0, 2] * A[2, 0] + A[1, 2] * A[2, 1]
+    return qcrit
+
+
+def get_lambda2(A):
+    """Return the lambda2 criterion from the velocity-gradient tensor.
+
+    lambda2 is the second (sorted) eigenvalue of S^2 + Omega^2, where
+    S and Omega are the symmetric and antisymmetric parts of the tensor;
+    vortex cores are regions with negative values.
+
+    """
+    A = numpy.moveaxis(A, (0, 1), (-2, -1))
+    At = numpy.swapaxes(A, -2, -1)
+    S, O = 0.5 * (A + At), 0.5 * (A - At)
+    return numpy.linalg.eigvalsh(S @ S + O @ O)[..., 1]
+
+
+def get_swirling_strength(A):
+    """Return the swirling strength from the velocity-gradient tensor.
+
+    The swirling strength is the imaginary part of the complex-conjugate
+    eigenvalues of the tensor (zero where all eigenvalues are real).
+
+    """
+    A = numpy.moveaxis(A, (0, 1), (-2, -1))
+    return numpy.abs(numpy.linalg.eigvals(A).imag).max(axis=-1)
+
+
+# Names of the fields derived from the velocity-gradient tensor.
+# The vorticity components computed from the cell-centered velocity
+# gradient are named w*_grad to differ from the cell-centered vorticity
+# averaged from the cell edges (e.g., 'wx_cc', see
+# `compute_cell_centered_field`).
+VORTEX_FIELDS = ('qcrit', 'lambda2', 'wx_grad', 'wy_grad', 'wz_grad',
+                 'swirl')
+
+
+def get_vortex_field(A, name):
+    """Return a field derived from the velocity-gradient tensor.
+
+    Parameters
+    ----------
+    A : numpy.ndarray
+        Velocity-gradient tensor with shape (3, 3, nz, ny, nx).
+    name : str
+        Name of the field; choices are 'qcrit' (Q-criterion),
+        'lambda2', 'wx_grad', 'wy_grad', 'wz_grad' (vorticity components
+        from the velocity gradient), and 'swirl' (swirling strength).
+
+    Returns
+    -------
+    numpy.ndarray
+        The field with shape (nz, ny, nx).
+
+    """
+    if name == 'qcrit':
+        return get_qcriterion(A)
+    elif name == 'lambda2':
+        return get_lambda2(A)
+    elif name in ('wx_grad', 'wy_grad', 'wz_grad'):
+        i = 'xyz'.index(name[1])
+        j, k = (i + 2) % 3, (i + 1) % 3
+        return A[j, k] - A[k, j]
+    elif name == 'swirl':
+        return get_swirling_strength(A)
+    raise ValueError('Unknown field: {} (choices: {})'
+                     .format(name, ', '.join(VORTEX_FIELDS)))
+
+
+def compute_qcriterion(velocity, grid):
+    """Compute the Q-criterion.
+
+    Parameters
+    ----------
+    velocity : tuple of numpy.ndarray
+        Cell-centered velocity components (u, v, w) with shape (nz, ny, nx).
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z).
+
+    Returns
+    -------
+    numpy.ndarray
+        Q-criterion with shape (nz, ny, nx).
+
+    """
+    return get_qcriterion(compute_velocity_gradient(velocity, grid))
+
+
+def get_chunk_shape(shape, itemsize=8, max_tile=128, chunk_bytes=2**20):
+    """Return a chunk shape suited for slab and slice reads.
+
+    Chunks are tiles of at most max_tile points along x and y (all
+    directions are split evenly to avoid padding partial chunks), stacked
+    along z up to about chunk_bytes; slices along any direction and
+    z-slabs then only touch a small number of chunks.
+
+    Parameters
+    ----------
+    shape : tuple of ints
+        Shape of the dataset (nz, ny, nx).
+    itemsize : int, optional
+        Number of bytes per value; default is 8.
+    max_tile : int, optional
+        Maximum number of points of a tile along x and y; default is 128.
+    chunk_bytes : int, optional
+        Target size of a chunk in bytes; default is 1 MiB.
+
+    Returns
+    -------
+    tuple of ints
+        Chunk shape.
+
+    """
+    nz, ny, nx = shape
+    cx, cy = (-(-n // -(-n // max_tile)) for n in (nx, ny))
+    cz = min(nz, max(1, chunk_bytes // (cx * cy * itemsize)))
+    cz = -(-nz // -(-nz // cz))
+    return (cz, cy, cx)
+
+
+def quantize(values, keep_bits):
+    """Round floats to a number of mantissa bits (lossy quantization).
+
+    Trailing mantissa bits are set to zero (with round-to-nearest), so the
+    relative error is at most 2**-(keep_bits + 1) and the data compress
+    much better with the shuffle and gzip filters.
+    Non-finite values (NaN and infinity) are returned unchanged; finite
+    values close to the largest float may round to infinity.
+    Use only for visualization-only fields.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Floating-point values (float32 or float64).
+    keep_bits : int
+        Number of mantissa bits to keep.
+
+    Returns
+    -------
+    numpy.ndarray
+        Quantized values (same dtype).
+
+    """
+    values = numpy.array(values)
+    nbits = numpy.finfo(values.dtype).nmant
+    if keep_bits >= nbits:
+        return values
+    drop = nbits - keep_bits
+    uint = numpy.dtype('u{}'.format(values.dtype.itemsize))
+    bits = values.view(uint)
+    one = uint.type(1)
+    # Round to nearest (ties to even) before truncating the mantissa.
+    half = (one << uint.type(drop - 1)) - one
+    rounded = bits + half + ((bits >> uint.type(drop)) & one)
+    rounded &= ~((one << uint.type(drop)) - one)
+    # The mantissa of NaN carries its payload: keep non-finite values.
+    bits[...] = numpy.where(numpy.isfinite(values), rounded, bits)
+    return values
+
+
+def create_field_dataset(group, name, shape, dtype='float64', chunks=None,
+                         compression=None, compression_opts=None,
+                         shuffle=False):
+    """Create a HDF5 dataset for a 3D field.
+
+    Without compression, the dataset is contiguous (as with petibmpy).
+    With compression or shuffling, the dataset is chunked
+    (see `get_chunk_shape`).
+
+    Parameters
+    ----------
+    group : h5py.Group
+        HDF5 file or group.
+    name : str
+        Name of the dataset.
+    shape : tuple of ints
+        Shape of the field (nz, ny, nx).
+    dtype : str or numpy.dtype, optional
+        Type of the stored values (e.g., 'float32'); default is 'float64'.
+    chunks : tuple of ints, optional
+        Chunk shape; default is None (see above).
+    compression : str, optional
+        Compression filter ('gzip' or 'lzf'); default is None.
+    compression_opts : int, optional
+        Compression level for gzip (0 to 9); default is None.
+    shuffle : bool, optional
+        Whether to use the byte-shuffle filter; default is False.
+
+    Returns
+    -------
+    h5py.Dataset
+        The dataset.
+
+    """
+    dtype = numpy.dtype(dtype)
+    if chunks is None and (compression is not None or shuffle):
+        chunks = get_chunk_shape(shape, itemsize=dtype.itemsize)
+    return group.create_dataset(name, shape=shape, dtype=dtype,
+                                chunks=chunks, compression=compression,
+                                compression_opts=compression_opts,
+                                shuffle=shuffle)
+
+
+def write_field_hdf5(filepath, name, values, keep_bits=None, **storage):
+    """Write a 3D field into a HDF5 file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the output file.
+    name : str
+        Name of the dataset.
+    values : numpy.ndarray
+        Field values with shape (nz, ny, nx).
+    keep_bits : int, optional
+        Number of mantissa bits to keep (see `quantize`);
+        default is None (no quantization).
+    storage : dict
+        Options of the dataset (see `create_field_dataset`).
+
+    """
+    with h5py.File(filepath, 'w') as outfile:
+        dset = create_field_dataset(outfile, name, values.shape, **storage)
+        dset[...] = _prepare_values(values, dset.dtype, keep_bits)
+
+
+def _prepare_values(values, dtype, keep_bits=None):
+    """Cast and quantize values before writing them."""
+    values = numpy.asarray(values, dtype=dtype)
+    if keep_bits is not None:
+        values = quantize(values, keep_bits)
+    return values
+
+
+def _create_datasets(outpaths, shape, storage=None):
+    """Create the output HDF5 files with one dataset each."""
+    storage = dict(storage or {})
+    keep_bits = storage.pop('keep_bits', None)
+    outfiles, dsets = [], {}
+    for name, outpath in outpaths.items():
+        outfile = h5py.File(outpath, 'w')
+        outfiles.append(outfile)
+        dsets[name] = create_field_dataset(outfile, name, shape, **storage)
+    return outfiles, dsets, keep_bits
+
+
+def _compute_cell_centered_timestep(filepath, outpaths, grid_from, grid,
+                                    limits, name, slab_size, storage=None):
+    """Interpolate a field of one time step on the cell-centered grid."""
+    print('[{}] Computing the cell-centered {} ...'
+          .format(filepath.name, name))
+    x, y, z = crop_grid(grid, limits)
+    (i0, i1), (j0, j1), (k0, k1) = limits
+    outfiles, dsets, keep_bits = _create_datasets(
+        outpaths, (z.size, y.size, x.size), storage=storage)
+    try:
+        dset, = dsets.values()
+        with h5py.File(filepath, 'r') as infile:
+            for start, end in get_slabs(k1 - k0, slab_size, offset=k0):
+                block = (x, y, grid[2][start:end])
+                values = read_cell_centered_field(infile, name, grid_from,
+                                                  block)
+                dset[start - k0:end - k0] = _prepare_values(
+                    values, dset.dtype, keep_bits)
+    finally:
+        for outfile in outfiles:
+            outfile.close()
+    return outpaths
+
+
+def _compute_vortex_fields_timestep(filepath, outpaths, grids, grid, limits,
+                                    slab_size, storage=None):
+    """Compute vortex-identification fields of one time step."""
+    print('[{}] Computing {} ...'.format(filepath.name, ', '.join(outpaths)))
+    x, y, z = grid
+    (i0, i1), (j0, j1), (k0, k1) = limits
+    shape = (k1 - k0, j1 - j0, i1 - i0)
+    # Extend the region with one-cell halos to get central differences
+    # at its boundaries (and at the slab interfaces).
+    ia, ib = get_halo_limits(i0, i1, x.size)
+    ja, jb = get_halo_limits(j0, j1, y.size)
+    outfiles, dsets, keep_bits = _create_datasets(outpaths, shape,
+                                                  storage=storage)
+    try:
+        for start, end in get_slabs(k1 - k0, slab_size, offset=k0):
+            ka, kb = get_halo_limits(start, end, z.size)
+            block = (x[ia:ib], y[ja:jb], z[ka:kb])
+            velocity = read_cell_centered_velocity(filepath, grids, block)
+            A = compute_velocity_gradient(velocity, block)
+            A = A[:, :, start - ka:end - ka, j0 - ja:j1 - ja, i0 - ia:i1 - ia]
+            for name, dset in dsets.items():
+                values = get_vortex_field(A, name)
+                dset[start - k0:end - k0] = _prepare_values(
+                    values, dset.dtype, keep_bits)
+    finally:
+        for outfile in outfiles:
+            outfile.close()
+    return outpaths
+
+
+def run_in_pool(func, tasks, max_workers=None):
+    """Run tasks in a pool of processes and return results in order.
+
+    Parameters
+    ----------
+    func : callable
+        Function to call (must be picklable, i.e., defined at module level).
+    tasks : list of dict
+        Keyword arguments of each call.
+    max_workers : int, optional
+        Number of processes (at most one per task); default is None
+        (value of the environment variable RODNEY_MAX_WORKERS if set,
+        number of CPUs otherwise).
+        With max_workers=1, tasks are run in the current process.
+
+    Returns
+    -------
+    list
+        Results of the calls.
+
+    """
+    if max_workers is None:
+        max_workers = int(os.environ.get(MAX_WORKERS_ENV, 0)) or None
+    max_workers = min(max_workers or os.cpu_count(), len(tasks))
+    if max_workers <= 1:
+        return [func(**task) for task in tasks]
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        futures = [executor.submit(func, **task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def _process_timesteps(func, datadir, timesteps, outdirs, box=None,
+                       params=None, incremental=False, content_hash=False,
+                       max_workers=None, **kwargs):
+    """Process time steps in parallel and write the grid and XDMF files.
+
+    In incremental mode, a manifest in each output directory records the
+    inputs and parameters of each output; up-to-date outputs are skipped.
+
+    """
+    datadir = pathlib.Path(datadir)
+    gridpath = datadir / 'grid.h5'
+    grid = petibmpy.read_grid_hdf5(gridpath, 'p')
+    limits = get_box_limits(grid, box=box)
+
+    # Save the cell-centered grid (cropped to the region of interest)
+    # on which are defined the outputs.
+    for name, outdir in outdirs.items():
+        outdir.mkdir(parents=True, exist_ok=True)
+        petibmpy.write_grid_hdf5(outdir / 'grid.h5', name,
+                                 *crop_grid(grid, limits))
+
+    manifests = {name: Manifest(outdir / 'manifest.json',
+                                content_hash=content_hash)
+                 for name, outdir in outdirs.items()}
+    params = dict(params or {}, box=box)
+    outpaths, tasks = [], []
+    for timestep in timesteps:
+        filepath = datadir / '{:0>7}.h5'.format(timestep)
+        paths = {name: outdir / '{:0>7}.h5'.format(timestep)
+                 for name, outdir in outdirs.items()}
+        outpaths.append(paths)
+        if incremental:
+            # Only compute the outputs that are out of date.
+            paths = {name: path for name, path in paths.items()
+                     if not manifests[name].is_up_to_date(
+                         path.name, [filepath, gridpath], [path],
+                         params=dict(params, name=name))}
+            if not paths:
+                print('[{}] Outputs are up to date'.format(filepath.name))
+                continue
+        tasks.append(dict(filepath=filepath, outpaths=paths, grid=grid,
+                          limits=limits, **kwargs))
+    run_in_pool(func, tasks, max_workers=max_workers)
+
+    # Record the inputs and parameters of the outputs.
+    for task in tasks:
+        for name, path in task['outpaths'].items():
+            manifests[name].update(path.name, [task['filepath'], gridpath],
+                                   [path], params=dict(params, name=name))
+    for manifest in manifests.values():
+        manifest.save()
+
+    # Write the XDMF files to visualize with VisIt.
+    for name, outdir in outdirs.items():
+        filepath = outdir / (name + '.xmf')
+        petibmpy.write_xdmf(filepath, outdir, outdir / 'grid.h5', name,
+                            states=timesteps)
+    return outpaths
+
+
+def compute_vortex_fields(datadir, timesteps, names=('qcrit',), outdir=None,
+                          box=None, storage=None, incremental=False,
+                          content_hash=False, slab_size=32,
+                          max_workers=None):
+    """Compute vortex-identification fields for several time steps.
+
+    The velocity components are read once per time step, interpolated on
+    the cell-centered grid, and the velocity-gradient tensor is computed
+    once; all requested fields are derived from the tensor and written
+    in the same pass.
+    Snapshots are processed in z-slabs (with one-cell halos), so the memory
+    footprint of a worker is bounded by the slab size, and time steps are
+    distributed over a pool of processes.
+    Each field is written in its own sub-folder (grid, one HDF5 file per
+    time step, and the XDMF file; same outputs as petibmpy).
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the grid and the solution files of PetIBM.
+    timesteps : list of ints
+        Time-step indices to process.
+    names : tuple of str, optional
+        Names of the fields to compute (see `VORTEX_FIELDS`);
+        default is ('qcrit',).
+    outdir : pathlib.Path, optional
+        Output directory; default is None (datadir/postprocessing).
+    box : tuple of floats, optional
+        Limits of the region of interest
+        (xstart, xend, ystart, yend, zstart, zend); only the cells inside
+        are processed and written (with the cropped grid);
+        default is None (entire domain).
+    storage : dict, optional
+        Storage options of the output datasets: 'dtype', 'chunks',
+        'compression', 'compression_opts', 'shuffle' (see
+        `create_field_dataset`), and 'keep_bits' (see `quantize`);
+        default is None (contiguous, uncompressed float64).
+    incremental : bool, optional
+        Whether to skip the outputs that are up to date, i.e., produced
+        from the same inputs and parameters (recorded in a manifest file
+        in the output directory); default is False.
+    content_hash : bool, optional
+        Whether to compare the content (hash) of the input files instead of
+        their size and modification time; default is False.
+    slab_size : int, optional
+        Number of cells along z in a slab; default is 32.
+    max_workers : int, optional
+        Number of processes; default is None (see `run_in_pool`).
+
+    Returns
+    -------
+    list of dict
+        Paths of the output HDF5 files for each time step.
+
+    """
+    datadir = pathlib.Path(datadir)
+    for name in names:
+        if name not in VORTEX_FIELDS:
+            raise ValueError('Unknown field: {} (choices: {})'
+                             .format(name, ', '.join(VORTEX_FIELDS)))
+    if outdir is None:
+        outdir = datadir / 'postprocessing'
+    outdirs = {name: pathlib.Path(outdir) / name for name in names}
+    gridpath = datadir / 'grid.h5'
+    grids = {v: petibmpy.read_grid_hdf5(gridpath, v) for v in ('u', 'v', 'w')}
+    return _process_timesteps(_compute_vortex_fields_timestep, datadir,
+                              timesteps, outdirs, box=box,
+                              params=dict(storage=storage),
+                              incremental=incremental,
+                              content_hash=content_hash,
+                              max_workers=max_workers, grids=grids,
+                              slab_size=slab_size, storage=storage)
+
+
+def compute_qcrit(datadir, timesteps, outdir=None, box=None, storage=None,
+                  incremental=False, content_hash=False, slab_size=32,
+                  max_workers=None):
+    """Compute the Q-criterion for several time steps.
+
+    See `compute_vortex_fields` for details.
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the grid and the solution files of PetIBM.
+    timesteps : list of ints
+        Time-step indices to process.
+    outdir : pathlib.Path, optional
+        Output directory; default is None (datadir/postprocessing).
+    box : tuple of floats, optional
+        Limits of the region of interest
+        (xstart, xend, ystart, yend, zstart, zend); only the cells inside
+        are processed and written (with the cropped grid);
+        default is None (entire domain).
+    storage : dict, optional
+        Storage options of the output datasets: 'dtype', 'chunks',
+        'compression', 'compression_opts', 'shuffle' (see
+        `create_field_dataset`), and 'keep_bits' (see `quantize`);
+        default is None (contiguous, uncompressed float64).
+    incremental : bool, optional
+        Whether to skip the outputs that are up to date, i.e., produced
+        from the same inputs and parameters (recorded in a manifest file
+        in the output directory); default is False.
+    content_hash : bool, optional
+        Whether to compare the content (hash) of the input files instead of
+        their size and modification time; default is False.
+    slab_size : int, optional
+        Number of cells along z in a slab; default is 32.
+    max_workers : int, optional
+        Number of processes; default is None (see `run_in_pool`).
+
+    Returns
+    -------
+    list of pathlib.Path
+        Paths of the output HDF5 files.
+
+    """
+    outpaths = compute_vortex_fields(datadir, timesteps, names=('qcrit',),
+                                     outdir=outdir, box=box,
+                                     storage=storage,
+                                     incremental=incremental,
+                                     content_hash=content_hash,
+                                     slab_size=slab_size,
+                                     max_workers=max_workers)
+    return [paths['qcrit'] for paths in outpaths]
+
+
+def compute_cell_centered_field(datadir, timesteps, name, outname=None,
+                                outdir=None, box=None, storage=None,
+                                incremental=False, content_hash=False,
+                                slab_size=32, max_workers=None):
+    """Interpolate a staggered field on the cell-centered grid.
+
+    The field is processed in z-slabs and averaged on the cell centers
+    with strided slices (see `rodney.interpolate_rectilinear`).
+    Time steps are distributed over a pool of processes.
+    The function writes the grid, one HDF5 file per time step,
+    and the XDMF file (same outputs as petibmpy).
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the grid and the solution files of PetIBM.
+    timesteps : list of ints
+        Time-step indices to process.
+    name : str
+        Name of the field (e.g., 'wx').
+    outname : str, optional
+        Name of the output variable; default is None (name + '_cc').
+    outdir : pathlib.Path, optional
+        Output directory; default is None (datadir/postprocessing).
+    box : tuple of floats, optional
+        Limits of the region of interest
+        (xstart, xend, ystart, yend, zstart, zend); only the cells inside
+        are processed and written (with the cropped grid);
+        default is None (entire domain).
+    storage : dict, optional
+        Storage options of the output datasets: 'dtype', 'chunks',
+        'compression', 'compression_opts', 'shuffle' (see
+        `create_field_dataset`), and 'keep_bits' (see `quantize`);
+        default is None (contiguous, uncompressed float64).
+    incremental : bool, optional
+        Whether to skip the outputs that are up to date, i.e., produced
+        from the same inputs and parameters (recorded in a manifest file
+        in the output directory); default is False.
+    content_hash : bool, optional
+        Whether to compare the content (hash) of the input files instead of
+        their size and modification time; default is False.
+    slab_size : int, optional
+        Number of cells along z in a slab; default is 32.
+    max_workers : int, optional
+        Number of processes; default is None (see `run_in_pool`).
+
+    Returns
+    -------
+    list of pathlib.Path
+        Paths of the output HDF5 files.
+
+    """
+    datadir = pathlib.Path(datadir)
+    if outname is None:
+        outname = name + '_cc'
+    if outdir is None:
+        outdir = datadir / 'postprocessing'
+    outdirs = {outname: pathlib.Path(outdir) / outname}
+    grid_from = petibmpy.read_grid_hdf5(datadir / 'grid.h5', name)
+    outpaths = _process_timesteps(_compute_cell_centered_timestep, datadir,
+                                  timesteps, outdirs, box=box,
+                                  params=dict(source=name, storage=storage),
+                                  incremental=incremental,
+                                  content_hash=content_hash,
+                                  max_workers=max_workers,
+                                  grid_from=grid_from, name=name,
+                                  slab_size=slab_size, storage=storage)
+    return [paths[outname] for paths in outpaths]
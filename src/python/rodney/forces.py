@@ -1,26 +1,161 @@
 """Functions to process forces and forces coefficients."""
 
 import collections
+import hashlib
+import io
+import json
 import numpy
+import os
+import pathlib
+import tempfile
 
 import petibmpy
 
+from .averaging import (get_cycle_convergence, get_cycle_statistics,
+                        get_phase_average)
+
 
 Solution = collections.namedtuple('Solution', ['t', 'ct', 'cl', 'cz'])
 Stats = collections.namedtuple('Stats', ['ct', 'cl', 'cz'])
 
+# Number of bytes before the parsed offset whose digest is checked before
+# parsing the lines appended to the forces file.
+_DIGEST_SIZE = 4096
+
+
+def _get_cache_paths(filepath):
+    """Return the paths of the binary cache and its metadata."""
+    filepath = pathlib.Path(filepath)
+    return (filepath.with_name(filepath.name + '.npy'),
+            filepath.with_name(filepath.name + '.json'))
+
+
+def _get_digest(filepath, offset):
+    """Return the digest of the bytes of the file preceding an offset."""
+    start = max(offset - _DIGEST_SIZE, 0)
+    with open(filepath, 'rb') as infile:
+        infile.seek(start)
+        return hashlib.sha1(infile.read(offset - start)).hexdigest()
+
+
+def _parse_forces(filepath, offset=0):
+    """Parse the complete lines of the forces file from a byte offset.
+
+    Return the data, the offset of the end of the last complete line,
+    and the digest of the bytes preceding it.
+    """
+    start = max(offset - _DIGEST_SIZE, 0)
+    with open(filepath, 'rb') as infile:
+        infile.seek(start)
+        content = infile.read()
+    # Skip a partially written last line.
+    end = max(content.rfind(b'\n') + 1, offset - start)
+    data = numpy.empty((0, 0))  # no complete line appended
+    if end > offset - start:
+        data = numpy.loadtxt(io.BytesIO(content[offset - start:end]),
+                             ndmin=2)
+    digest = hashlib.sha1(
+        content[max(start + end - _DIGEST_SIZE, 0) - start:end]).hexdigest()
+    return data, start + end, digest
+
+
+def _replace_file(path, write):
+    """Write a file through a unique temporary file that replaces it."""
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name,
+                                     suffix='.tmp', delete=False) as outfile:
+        try:
+            write(outfile)
+        except Exception:
+            os.remove(outfile.name)
+            raise
+    os.replace(outfile.name, path)
+
+
+def _write_cache(filepath, data, offset, digest):
+    """Write the binary cache and its metadata (keyed on size and mtime).
+
+    Each file replaces the previous one through a unique temporary file,
+    so that concurrent callers never read or write a partial file.
+    """
+    stat = os.stat(filepath)
+    datapath, metapath = _get_cache_paths(filepath)
+    meta = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'offset': offset, 'digest': digest, 'shape': list(data.shape)}
+    _replace_file(datapath, lambda outfile: numpy.save(outfile, data))
+    _replace_file(metapath,
+                  lambda outfile: outfile.write(json.dumps(meta).encode()))
+
+
+def read_forces_cached(filepath, incremental=False):
+    """Read the forces from file using a memory-mappable binary cache.
 
-def load_force_coefficients(filepath, config):
-    """Load forces from file and return force coefficients."""
+    The first call parses the ASCII file and writes a `.npy` sidecar
+    (next to the file) with a JSON metadata file keyed on the size and
+    the modification time of the ASCII file.
+    Subsequent calls map the sidecar (zero-copy) as long as the ASCII file
+    has not changed.
+    If the cache cannot be written, the forces are parsed from file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file with the forces (e.g., forces-0.txt).
+    incremental : bool, optional
+        If True and the file has grown since the cache was written
+        (simulation still running), only the appended lines are parsed;
+        the file is parsed again if the bytes before the cached offset
+        have changed (file truncated or rewritten by a restart);
+        default is False (parse the whole file again).
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Time values and force components as read-only 1D arrays of floats.
+
+    """
+    datapath, metapath = _get_cache_paths(filepath)
+    stat = os.stat(filepath)
+    meta = None
+    if datapath.is_file() and metapath.is_file():
+        with open(metapath, 'r') as infile:
+            meta = json.load(infile)
+    if (meta is not None and meta['size'] == stat.st_size and
+            meta['mtime_ns'] == stat.st_mtime_ns):
+        data = numpy.load(datapath, mmap_mode='r')
+        return tuple(data.T)
+    if (incremental and meta is not None and
+            stat.st_size > meta['offset'] and
+            meta.get('digest') == _get_digest(filepath, meta['offset'])):
+        new, offset, digest = _parse_forces(filepath, offset=meta['offset'])
+        old = numpy.load(datapath)
+        data = numpy.concatenate((old, new)) if new.size > 0 else old
+    else:
+        data, offset, digest = _parse_forces(filepath)
+    try:
+        _write_cache(filepath, data, offset, digest)
+    except OSError:
+        return tuple(data.T)
+    data = numpy.load(datapath, mmap_mode='r')
+    return tuple(data.T)
+
+
+def load_force_coefficients(filepath, config, cache=True, incremental=False):
+    """Load forces from file and return force coefficients.
+
+    With cache=True, forces are read through `read_forces_cached`.
+    """
     # Load forces from file.
-    t, fx, fy, fz = petibmpy.read_forces(filepath)
-    fx *= -1.0  # drag to thrust
+    if cache:
+        t, fx, fy, fz = read_forces_cached(filepath, incremental=incremental)
+    else:
+        t, fx, fy, fz = petibmpy.read_forces(filepath)
+    fx = -1.0 * fx  # drag to thrust
     # Convert forces to force coefficients.
     rho, U_inf, A_plan = (getattr(config, name)
                           for name in ('rho', 'U_inf', 'A_plan'))
     coeff = 1 / (0.5 * rho * U_inf**2 * A_plan)
     # Non-dimensionalize time values by period.
-    t /= config.T
+    t = t / config.T
     ct, cl, cz = petibmpy.get_force_coefficients(fx, fy, fz, coeff=coeff)
     return Solution(t=t, ct=ct, cl=cl, cz=cz)
 
@@ -32,6 +167,41 @@ def get_stats(solution, limits=(0, numpy.infty)):
     return means, rms
 
 
+def get_phase_averages(solution, nbins=100, limits=(0, numpy.infty)):
+    """Compute phase-averaged force coefficients.
+
+    Time values of the solution are normalized by the period
+    (see `load_force_coefficients`), so the phase is t mod 1.
+
+    Returns
+    -------
+    Solution
+        Phase (center of the bins) and phase-averaged force coefficients.
+    Solution
+        Phase and standard deviation of the force coefficients in each bin.
+
+    """
+    averages = [get_phase_average(solution.t, values, nbins=nbins,
+                                  limits=limits)
+                for values in solution[1:]]
+    phase = averages[0].phase
+    means = Solution(phase, *(average.mean for average in averages))
+    stds = Solution(phase, *(average.std for average in averages))
+    return means, stds
+
+
+def get_cycle_stats(solution):
+    """Compute statistics of the force coefficients over each cycle."""
+    return Stats(*(get_cycle_statistics(solution.t, values)
+                   for values in solution[1:]))
+
+
+def get_cycle_convergences(solution, nbins=100):
+    """Compute cycle-to-cycle convergence metrics of the coefficients."""
+    return Stats(*(get_cycle_convergence(solution.t, values, nbins=nbins)
+                   for values in solution[1:]))
+
+
 def print_stats(label, means, rms, ndigits=3):
     """Print statistics about the force coefficients."""
     def r(v):
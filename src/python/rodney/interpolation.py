@@ -0,0 +1,277 @@
+"""Trilinear interpolation with cached stencils on rectilinear grids."""
+
+import numpy
+
+
+class TrilinearInterpolator(object):
+    """Trilinear interpolation from a fixed rectilinear grid to points.
+
+    Neighbor indices and weights of the query points are computed once
+    and cached; interpolating a new field is then a single gather followed
+    by a multiply-add.
+    Fields are stored with the layout used by PetIBM, i.e., (nz, ny, nx).
+    Points outside the grid are linearly extrapolated from the closest cell.
+
+    Parameters
+    ----------
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z) as 1D arrays of increasing floats.
+    points : numpy.ndarray, optional
+        Coordinates of the query points as an array of floats with
+        shape (N, 3) or (nt, N, 3) (one set of points per field);
+        default is None (points set later with `set_points`).
+
+    """
+
+    def __init__(self, grid, points=None):
+        """Store the grid and compute the stencil of the points."""
+        self.grid = tuple(numpy.asarray(gridline, dtype=float)
+                          for gridline in grid)
+        assert len(self.grid) == 3, 'Grid should be 3D'
+        nx, ny, nz = (gridline.size for gridline in self.grid)
+        self.shape = (nz, ny, nx)
+        self.size = nx * ny * nz
+        # Flat offsets of the 8 corners (x index varying the fastest).
+        self._offsets = (numpy.arange(2)[:, None, None] * ny * nx +
+                         numpy.arange(2)[None, :, None] * nx +
+                         numpy.arange(2)[None, None, :]).ravel()
+        self.points = None
+        if points is not None:
+            self.set_points(points)
+
+    def _find_cells(self, points):
+        """Return the indices of the cells containing the points."""
+        cells = numpy.empty(points.shape, dtype=numpy.intp)
+        for dim, gridline in enumerate(self.grid):
+            i = numpy.searchsorted(gridline, points[..., dim]) - 1
+            cells[..., dim] = numpy.clip(i, 0, gridline.size - 2)
+        return cells
+
+    def _compute_weights(self, points, cells):
+        """Return the weights of the 8 corners of the cells."""
+        w = []
+        for dim, gridline in enumerate(self.grid):
+            i = cells[..., dim]
+            x0, x1 = gridline[i], gridline[i + 1]
+            frac = (points[..., dim] - x0) / (x1 - x0)
+            w.append(numpy.stack((1 - frac, frac), axis=-1))
+        wx, wy, wz = w
+        weights = (wz[..., :, None, None] * wy[..., None, :, None] *
+                   wx[..., None, None, :])
+        return weights.reshape(points.shape[:-1] + (8,))
+
+    def _compute_indices(self, cells):
+        """Return the flat indices of the 8 corners of the cells."""
+        nz, ny, nx = self.shape
+        i, j, k = cells[..., 0], cells[..., 1], cells[..., 2]
+        base = (k * ny + j) * nx + i
+        if cells.ndim == 3:
+            # One set of points per field: shift to the field in the stack.
+            base += self.size * numpy.arange(cells.shape[0])[:, None]
+        return base[..., None] + self._offsets
+
+    def set_points(self, points):
+        """Compute and cache the stencil of the query points.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            Coordinates of the query points as an array of floats with
+            shape (N, 3) or (nt, N, 3).
+
+        """
+        points = numpy.array(points, dtype=float)
+        assert points.ndim in (2, 3) and points.shape[-1] == 3
+        self.points = points
+        self.cells = self._find_cells(points)
+        self.weights = self._compute_weights(points, self.cells)
+        self.indices = self._compute_indices(self.cells)
+
+    def update_points(self, points):
+        """Update the stencil for points that have moved.
+
+        The neighbor search is only done for points that have left
+        their cell; weights are only recomputed for points that have moved.
+
+        Parameters
+        ----------
+        points : numpy.ndarray
+            New coordinates of the query points (same shape as the points
+            currently cached).
+
+        Returns
+        -------
+        int
+            Number of points that have crossed into a new cell.
+
+        """
+        points = numpy.asarray(points, dtype=float)
+        if self.points is None or points.shape != self.points.shape:
+            self.set_points(points)
+            return points[..., 0].size
+        moved = numpy.any(points != self.points, axis=-1)
+        if not numpy.any(moved):
+            return 0
+        # Check if moved points are still inside their cached cell.
+        new, cells = points[moved], self.cells[moved]
+        crossed = numpy.zeros(cells.shape[0], dtype=bool)
+        for dim, gridline in enumerate(self.grid):
+            xi, i = new[:, dim], cells[:, dim]
+            crossed |= (xi < gridline[i]) & (i > 0)
+            crossed |= (xi > gridline[i + 1]) & (i < gridline.size - 2)
+        if numpy.any(crossed):
+            cells[crossed] = self._find_cells(new[crossed])
+            self.cells[moved] = cells
+            self.indices = self._compute_indices(self.cells)
+        self.weights[moved] = self._compute_weights(new, cells)
+        self.points = points.copy()
+        return int(numpy.count_nonzero(crossed))
+
+    def __call__(self, values):
+        """Interpolate field(s) at the query points.
+
+        Parameters
+        ----------
+        values : numpy.ndarray
+            Field values as an array of floats with shape (nz, ny, nx),
+            or a stack of fields with shape (nt, nz, ny, nx).
+            When points were set with shape (nt, N, 3), the stack should
+            hold one field per set of points.
+
+        Returns
+        -------
+        numpy.ndarray
+            Interpolated values as an array of floats with shape (N,)
+            or (nt, N).
+
+        """
+        values = numpy.asarray(values)
+        if values.shape == self.shape:
+            assert self.indices.ndim == 2, 'Expected a stack of fields'
+            return numpy.sum(values.ravel()[self.indices] * self.weights,
+                             axis=-1)
+        assert values.shape[1:] == self.shape, 'Incompatible field shape'
+        nt = values.shape[0]
+        if self.indices.ndim == 3:
+            assert self.indices.shape[0] == nt
+            return numpy.sum(values.ravel()[self.indices] * self.weights,
+                             axis=-1)
+        flat = values.reshape(nt, self.size)
+        return numpy.einsum('tnk,nk->tn', flat[:, self.indices],
+                            self.weights)
+
+
+def get_linear_stencil(x, xi):
+    """Return the 1D linear-interpolation stencil of points on a gridline.
+
+    Points outside the gridline are extrapolated from the closest interval.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Gridline coordinates as a 1D array of increasing floats.
+    xi : numpy.ndarray
+        Coordinates of the query points as a 1D array of floats.
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices of the left neighbors as a 1D array of ints.
+    numpy.ndarray
+        Weights of the right neighbors as a 1D array of floats.
+
+    """
+    i = numpy.clip(numpy.searchsorted(x, xi) - 1, 0, x.size - 2)
+    w = (xi - x[i]) / (x[i + 1] - x[i])
+    return i, w
+
+
+def get_consecutive_runs(i):
+    """Return the limits of the runs of consecutive integers in an array."""
+    breaks = numpy.flatnonzero(numpy.diff(i) != 1) + 1
+    bounds = numpy.concatenate(([0], breaks, [i.size]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def interpolate_axis(values, x, xi, axis, max_runs=8):
+    """Linearly interpolate a field along one axis.
+
+    When the target gridline is shifted from the source one (e.g., from
+    faces to cell centers), the left neighbors of consecutive points are
+    consecutive: the interpolation is then done on strided slices of the
+    field (no index arrays, no coordinate meshes), with the exact weights
+    of the stretched gridline.
+    Points outside the source gridline (e.g., the first and last cell
+    centers) are linearly extrapolated.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Field values.
+    x : numpy.ndarray
+        Source gridline along the axis as a 1D array of increasing floats.
+    xi : numpy.ndarray
+        Target gridline along the axis as a 1D array of increasing floats.
+    axis : int
+        Axis of the field to interpolate along.
+    max_runs : int, optional
+        Maximum number of runs of consecutive neighbors processed with
+        slices; above, the neighbors are gathered with index arrays;
+        default is 8.
+
+    Returns
+    -------
+    numpy.ndarray
+        Interpolated field values.
+
+    """
+    if x.size == xi.size and numpy.array_equal(x, xi):
+        return values
+    i, w = get_linear_stencil(x, xi)
+    values = numpy.moveaxis(values, axis, 0)
+    w = w.reshape((-1,) + (1,) * (values.ndim - 1))
+    runs = get_consecutive_runs(i)
+    if len(runs) > max_runs:
+        lo, hi = values[i], values[i + 1]
+        return numpy.moveaxis(lo + w * (hi - lo), 0, axis)
+    shape = (xi.size,) + values.shape[1:]
+    out = numpy.empty(shape, dtype=numpy.result_type(values, w))
+    for start, end in runs:
+        s = i[start]
+        lo = values[s:s + end - start]
+        hi = values[s + 1:s + 1 + end - start]
+        res = out[start:end]
+        numpy.subtract(hi, lo, out=res)
+        res *= w[start:end]
+        res += lo
+    return numpy.moveaxis(out, 0, axis)
+
+
+def interpolate_rectilinear(values, grid, grid_to):
+    """Linearly interpolate a 3D field between two rectilinear grids.
+
+    The trilinear interpolation is done as a sequence of 1D interpolations
+    (see `interpolate_axis`), skipping directions where the gridlines match;
+    e.g., a face-centered velocity component is averaged along a single
+    direction, an edge-centered vorticity component along two directions.
+    Points outside the source grid are linearly extrapolated.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Field values as an array of floats with shape (nz, ny, nx).
+    grid : tuple of numpy.ndarray
+        Source gridlines (x, y, z).
+    grid_to : tuple of numpy.ndarray
+        Target gridlines (x, y, z).
+
+    Returns
+    -------
+    numpy.ndarray
+        Interpolated values on the target grid.
+
+    """
+    for axis, x, xi in zip((2, 1, 0), grid, grid_to):
+        values = interpolate_axis(values, numpy.asarray(x),
+                                  numpy.asarray(xi), axis)
+    return values
@@ -0,0 +1,324 @@
+"""Parser of the PETSc performance summary (-log_view) of the runs."""
+
+import collections
+import pathlib
+import re
+import warnings
+import yaml
+
+
+LogView = collections.namedtuple('LogView', ['nprocs', 'version', 'summary',
+                                             'stages', 'events'])
+
+LogStage = collections.namedtuple('LogStage', ['index', 'name', 'time',
+                                               'time_pct', 'flop', 'flop_pct',
+                                               'messages', 'messages_pct',
+                                               'message_lengths',
+                                               'message_lengths_pct',
+                                               'reductions',
+                                               'reductions_pct'])
+
+LogEvent = collections.namedtuple('LogEvent', ['stage', 'name', 'count',
+                                               'count_ratio', 'time',
+                                               'time_ratio', 'flop',
+                                               'flop_ratio', 'messages',
+                                               'message_length',
+                                               'reductions', 'global_pct',
+                                               'stage_pct', 'mflops'])
+
+RunReport = collections.namedtuple('RunReport', ['name', 'nodes', 'nprocs',
+                                                 'ncells', 'nsteps',
+                                                 'wall_time', 'time_per_step',
+                                                 'stage_times',
+                                                 'poisson_per_step',
+                                                 'kinematics_per_step',
+                                                 'gflops', 'efficiency'])
+
+# Logging stages of PetIBM used in the report.
+POISSON_STAGE = 'solvePoisson'
+KINEMATICS_STAGE = 'moveIB'
+
+_NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+_NPROCS_PATTERN = re.compile(r' with (\d+) process(?:or)?s?,')
+_VERSION_PATTERN = re.compile(r'Using Petsc (?:Release |Development )?'
+                              r'Version ([^\s,]+)')
+_SUMMARY_PATTERN = re.compile(r'^(Time \(sec\)|Objects|Flops?|Flops?/sec|'
+                              r'MPI Messages|MPI Message Lengths|'
+                              r'MPI Reductions|Memory):\s+(.*)$')
+_STAGE_PATTERN = re.compile(r'^\s*(\d+):\s+(.+?):\s+(\S.*)$')
+_EVENT_STAGE_PATTERN = re.compile(r'^--- Event Stage (\d+): (.+)$')
+
+
+def _is_number(token):
+    """Check if a string is a number."""
+    return re.fullmatch(_NUMBER, token) is not None
+
+
+def _split_stage_percentages(tokens, start, n=5):
+    """Split the stage percentages printed without separator.
+
+    PETSc prints the percentages of the stage with the format %3.0f and
+    no separator; a value of 100 is glued to its neighbors
+    (e.g., '100100100100100' or ' 99100').
+    """
+    fields, i = [], start
+    while len(fields) < n and i < len(tokens):
+        token = tokens[i]
+        if token.isdigit() and len(token) > 3:
+            fields.extend(token[max(k - 3, 0):k]
+                          for k in range(len(token) % 3 or 3,
+                                         len(token) + 1, 3))
+        else:
+            fields.append(token)
+        i += 1
+    return tokens[:start] + fields + tokens[i:]
+
+
+def _parse_event(line, stage):
+    """Parse an event line of the performance summary (None if invalid)."""
+    tokens = line.split()
+    i = len(tokens)
+    while i > 1 and _is_number(tokens[i - 1]):
+        i -= 1
+    values = [float(token) for token in
+              _split_stage_percentages(tokens[i:], 14)]
+    if i == 0 or len(values) < 20:
+        return None
+    # Newer versions of PETSc add GPU columns after the total Mflop/s.
+    return LogEvent(stage=stage, name=' '.join(tokens[:i]),
+                    count=int(values[0]), count_ratio=values[1],
+                    time=values[2], time_ratio=values[3],
+                    flop=values[4], flop_ratio=values[5],
+                    messages=values[6], message_length=values[7],
+                    reductions=values[8], global_pct=tuple(values[9:14]),
+                    stage_pct=tuple(values[14:19]), mflops=values[19])
+
+
+def read_log_view(filepath):
+    """Read the performance summary written by PETSc with -log_view.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the ASCII log file (e.g., view.log).
+
+    Returns
+    -------
+    LogView
+        Number of processes, version of PETSc, global summary
+        (dictionary of (max, max/min, avg, total) values; e.g., 'Time (sec)'
+        or 'Flop'), stages (dictionary of LogStage, keyed by name),
+        and events (dictionary of lists of LogEvent, keyed by stage name).
+
+    """
+    nprocs, version = None, None
+    summary, stages = {}, collections.OrderedDict()
+    events = collections.OrderedDict()
+    section, stage = None, None
+    with open(filepath, 'r') as infile:
+        for line in infile:
+            line = line.rstrip()
+            if nprocs is None:
+                match = _NPROCS_PATTERN.search(line)
+                if match:
+                    nprocs = int(match.group(1))
+            if version is None:
+                match = _VERSION_PATTERN.search(line)
+                if match:
+                    version = match.group(1)
+            if line.startswith('Summary of Stages:'):
+                section = 'stages'
+                continue
+            if line.startswith('Event ') and 'Count' in line:
+                section = 'events'
+                continue
+            if line.startswith('Memory usage is given in bytes'):
+                section = 'objects'  # nothing else to parse
+                continue
+            match = _SUMMARY_PATTERN.match(line)
+            if match and section is None:
+                values = [float(token) for token in match.group(2).split()
+                          if _is_number(token)]
+                values += [None] * (4 - len(values))
+                key = match.group(1).replace('Flops', 'Flop')  # PETSc<3.10
+                summary[key] = tuple(values[:4])
+                continue
+            if section == 'stages':
+                match = _STAGE_PATTERN.match(line)
+                tokens = match.group(3).split() if match else []
+                if len(tokens) >= 10 and all(_is_number(token.rstrip('%'))
+                                             for token in tokens):
+                    values = [float(token.rstrip('%')) for token in tokens]
+                    stages[match.group(2)] = LogStage(
+                        int(match.group(1)), match.group(2), *values[:10])
+            elif section == 'events':
+                match = _EVENT_STAGE_PATTERN.match(line)
+                if match:
+                    stage = match.group(2).strip()
+                    events[stage] = []
+                    continue
+                if stage is None or not line.strip() or line.startswith('-'):
+                    continue
+                event = _parse_event(line, stage)
+                if event is None:
+                    warnings.warn('{}: cannot parse event line: {}'
+                                  .format(filepath, line))
+                    continue
+                events[stage].append(event)
+    return LogView(nprocs=nprocs, version=version, summary=summary,
+                   stages=stages, events=events)
+
+
+def get_event(logview, stage, name):
+    """Return an event of a stage (None if not logged)."""
+    for event in logview.events.get(stage, []):
+        if event.name == name:
+            return event
+    return None
+
+
+def get_run_info(simudir):
+    """Return the number of nodes, cells, and time steps of a run.
+
+    The number of nodes is read from the SLURM script (pegasus.slurm),
+    the number of cells and time steps from the configuration file.
+
+    Parameters
+    ----------
+    simudir : pathlib.Path
+        Directory of the run.
+
+    Returns
+    -------
+    tuple
+        Number of nodes (None if unknown), cells, and time steps.
+
+    """
+    simudir = pathlib.Path(simudir)
+    nodes = None
+    filepath = simudir / 'pegasus.slurm'
+    if filepath.is_file():
+        match = re.search(r'^#SBATCH\s+--nodes=(\d+)', filepath.read_text(),
+                          flags=re.MULTILINE)
+        if match:
+            nodes = int(match.group(1))
+    with open(simudir / 'config.yaml', 'r') as infile:
+        config = yaml.safe_load(infile)
+    ncells = 1
+    for direction in config['mesh']:
+        ncells *= sum(sub['cells'] for sub in direction['subDomains'])
+    params = config['parameters']
+    nsteps = params['nt'] - params.get('startStep', 0)
+    return nodes, ncells, nsteps
+
+
+def get_run_report(simudir, logname='view.log',
+                   poisson_stage=POISSON_STAGE,
+                   kinematics_stage=KINEMATICS_STAGE):
+    """Return the performance report of a run.
+
+    Parameters
+    ----------
+    simudir : pathlib.Path
+        Directory of the run.
+    logname : str, optional
+        Name of the log file in the run directory; default is 'view.log'.
+    poisson_stage : str, optional
+        Logging stage of the Poisson solve; default is 'solvePoisson'.
+    kinematics_stage : str, optional
+        Logging stage of the update of the body kinematics;
+        default is 'moveIB'.
+
+    Returns
+    -------
+    RunReport
+        Report of the run (times in seconds; efficiency set to None).
+
+    """
+    simudir = pathlib.Path(simudir)
+    logview = read_log_view(simudir / logname)
+    nodes, ncells, nsteps = get_run_info(simudir)
+    wall_time = logview.summary.get('Time (sec)', (None,))[0]
+    stage_times = collections.OrderedDict(
+        (name, stage.time / nsteps) for name, stage in logview.stages.items())
+    flop = logview.summary.get('Flop', (None,) * 4)[3]
+    return RunReport(name=simudir.name, nodes=nodes, nprocs=logview.nprocs,
+                     ncells=ncells, nsteps=nsteps, wall_time=wall_time,
+                     time_per_step=wall_time / nsteps,
+                     stage_times=stage_times,
+                     poisson_per_step=stage_times.get(poisson_stage),
+                     kinematics_per_step=stage_times.get(kinematics_stage),
+                     gflops=(flop / wall_time * 1e-9
+                             if flop is not None else None),
+                     efficiency=None)
+
+
+def get_log_view_report(simudirs, logname='view.log', **kwargs):
+    """Return the performance reports of several runs.
+
+    The parallel efficiency of a run is computed relative to the run
+    with the same number of cells using the fewest nodes (or processes):
+    efficiency = (T_ref * N_ref) / (T * N), with T the time per step.
+
+    Parameters
+    ----------
+    simudirs : list of pathlib.Path
+        Directories of the runs (those without log file are ignored).
+    logname : str, optional
+        Name of the log file in the run directories; default is 'view.log'.
+    kwargs : dict
+        Logging stages of the report (see `get_run_report`).
+
+    Returns
+    -------
+    list of RunReport
+        Reports of the runs.
+
+    """
+    reports = [get_run_report(simudir, logname=logname, **kwargs)
+               for simudir in map(pathlib.Path, simudirs)
+               if (simudir / logname).is_file()]
+    size = {report.name: report.nodes or report.nprocs for report in reports}
+    refs = {}
+    for report in sorted(reports, key=lambda report: size[report.name]):
+        refs.setdefault(report.ncells, report)
+    for i, report in enumerate(reports):
+        ref = refs[report.ncells]
+        reports[i] = report._replace(
+            efficiency=(ref.time_per_step * size[ref.name] /
+                        (report.time_per_step * size[report.name])))
+    return reports
+
+
+def print_log_view_report(reports, stages=None):
+    """Print a table with the performance reports of runs.
+
+    Parameters
+    ----------
+    reports : list of RunReport
+        Reports of the runs.
+    stages : list of str, optional
+        Logging stages whose time per step is displayed;
+        default is None (Poisson solve and kinematics update only).
+
+    """
+    stages = stages or []
+    header = (['run', 'nodes', 'procs', 'cells (M)', 'steps', 'wall (h)',
+               's/step', 'poisson', 'kinematics'] + list(stages) +
+              ['Gflop/s', 'efficiency'])
+    rows = []
+    for report in reports:
+        rows.append([report.name, report.nodes, report.nprocs,
+                     report.ncells * 1e-6, report.nsteps,
+                     report.wall_time / 3600.0, report.time_per_step,
+                     report.poisson_per_step, report.kinematics_per_step] +
+                    [report.stage_times.get(stage) for stage in stages] +
+                    [report.gflops, report.efficiency])
+    rows = [['-' if value is None else
+             '{:.3g}'.format(value) if isinstance(value, float) else
+             str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in [header] + rows)
+              for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(value.rjust(width) if i else value.ljust(width)
+                        for i, (value, width) in enumerate(zip(row, widths))))
@@ -0,0 +1,137 @@
+"""Manifest to skip post-processing outputs that are up to date."""
+
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+
+
+def get_file_fingerprint(filepath, content_hash=False):
+    """Return the fingerprint of a file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file.
+    content_hash : bool, optional
+        Whether to hash the content of the file (SHA-256) instead of using
+        its size and modification time; default is False.
+
+    Returns
+    -------
+    list or None
+        Size and modification time (in ns), or size and hash;
+        None if the file does not exist.
+
+    """
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return None
+    if not content_hash:
+        return [stat.st_size, stat.st_mtime_ns]
+    sha = hashlib.sha256()
+    with open(filepath, 'rb') as infile:
+        for block in iter(lambda: infile.read(2**20), b''):
+            sha.update(block)
+    return [stat.st_size, sha.hexdigest()]
+
+
+def get_parameters_hash(params):
+    """Return a hash of parameters that can be serialized to JSON."""
+    text = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Manifest(object):
+    """Record of the inputs and parameters used to produce output files.
+
+    Each entry (e.g., one output file) stores the fingerprints of its input
+    and output files and a hash of the parameters; the entry is up to date
+    when none of them has changed.
+    Output fingerprints are always based on size and modification time.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the JSON manifest file (created on save).
+    content_hash : bool, optional
+        Whether to hash the content of the input files instead of using
+        their size and modification time; default is False.
+
+    """
+
+    def __init__(self, filepath, content_hash=False):
+        """Load the manifest from file (if it exists)."""
+        self.filepath = pathlib.Path(filepath)
+        self.content_hash = content_hash
+        self.entries = {}
+        if self.filepath.is_file():
+            try:
+                with open(self.filepath, 'r') as infile:
+                    self.entries = json.load(infile)
+            except ValueError:
+                pass  # corrupted manifest: everything is out of date
+
+    def _get_record(self, inputs, outputs, params):
+        """Return the record of inputs, outputs, and parameters."""
+        return dict(
+            inputs={str(path): get_file_fingerprint(
+                path, content_hash=self.content_hash) for path in inputs},
+            outputs={str(path): get_file_fingerprint(path)
+                     for path in outputs},
+            params=get_parameters_hash(params))
+
+    def is_up_to_date(self, key, inputs, outputs, params=None):
+        """Check if an entry is up to date.
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry.
+        inputs : list of pathlib.Path
+            Input files.
+        outputs : list of pathlib.Path
+            Output files.
+        params : dict, optional
+            Parameters used to produce the outputs; default is None.
+
+        Returns
+        -------
+        bool
+            True if the outputs exist and neither the inputs,
+            the outputs, nor the parameters have changed.
+
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        record = self._get_record(inputs, outputs, params)
+        if any(fingerprint is None
+               for fingerprint in record['outputs'].values()):
+            return False
+        return record == entry
+
+    def update(self, key, inputs, outputs, params=None):
+        """Record the inputs, outputs, and parameters of an entry."""
+        self.entries[key] = self._get_record(inputs, outputs, params)
+
+    def save(self):
+        """Write the manifest into file atomically.
+
+        The manifest is written into a unique temporary file that replaces
+        it, so that concurrent writers never share a partial file.
+
+        """
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(mode='w', dir=self.filepath.parent,
+                                         prefix=self.filepath.name,
+                                         suffix='.tmp',
+                                         delete=False) as outfile:
+            try:
+                json.dump(self.entries, outfile, indent=1, sort_keys=True)
+            except Exception:
+                os.remove(outfile.name)
+                raise
+        os.replace(outfile.name, self.filepath)
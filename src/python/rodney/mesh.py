@@ -0,0 +1,293 @@
+"""Design of stretched Cartesian grids fitting a cell budget."""
+
+import collections
+import math
+import numpy
+
+import petibmpy
+
+from .preflight import BYTES_PER_CELL
+
+
+MeshDesign = collections.namedtuple('MeshDesign', ['config', 'ncells',
+                                                   'shape', 'ratios',
+                                                   'boxes'])
+
+# Candidate stretching ratios of the sub-domains (1.01 to 1.20).
+STRETCH_RATIOS = numpy.round(numpy.linspace(1.01, 1.2, num=20), 2)
+
+# Faces of the boxes (in the order of their limits).
+FACES = ('xstart', 'xend', 'ystart', 'yend', 'zstart', 'zend')
+
+
+def resize_for_uniform(L, xc, dx, buf=0.0):
+    """Adjust the limits of the interval to allow uniform discretization."""
+    xs, xe = xc - L / 2 - buf, xc + L / 2 + buf
+    L = xe - xs
+    n = math.ceil(L / dx - 1e-8)
+    L = n * dx
+    xs, xe = xc - L / 2, xc + L / 2
+    assert abs((xe - xs) / n - dx) < 1e-12
+    return xs, xe
+
+
+def get_gridline_config(p1, p2, p3, p4, p5, p6, d1, d2, r1, r2, r3, r4,
+                        max_width=None):
+    """Create configuration of sub-domains along a direction.
+
+    The gridline is uniform with width d2 in [p3, p4], stretched from d2
+    to d1 on both sides (ratios r2 and r3), uniform with width d1 up to
+    p2 and p5, and stretched from d1 to max_width up to p1 and p6
+    (ratios r1 and r4).
+
+    Parameters
+    ----------
+    p1, p2, p3, p4, p5, p6 : float
+        Limits of the domain, of the intermediate box, and of the uniform
+        box along the direction.
+    d1 : float
+        Cell width in the intermediate box.
+    d2 : float
+        Cell width in the uniform box.
+    r1, r2, r3, r4 : float
+        Stretching ratios of the sub-domains (from the uniform box).
+    max_width : float, optional
+        Maximum cell width; default is None (20 * d1).
+
+    Returns
+    -------
+    list of dict
+        Configuration of the sub-domains (see petibmpy.CartesianGrid).
+
+    """
+    if max_width is None:
+        max_width = 20 * d1
+    cfg = []
+    cfg.append(dict(start=p1, end=p2, width=d1, stretchRatio=r1,
+                    max_width=max_width, reverse=True))
+    cfg.append(dict(start=p2, end=p3, width=d2, stretchRatio=r2, max_width=d1,
+                    reverse=True))
+    cfg.append(dict(start=p3, end=p4, width=d2))
+    cfg.append(dict(start=p4, end=p5, width=d2, stretchRatio=r3, max_width=d1))
+    cfg.append(dict(start=p5, end=p6, width=d1, stretchRatio=r4,
+                    max_width=max_width))
+    return cfg
+
+
+def get_segment_ncells(length, width, ratio, max_width):
+    """Return the approximate number of cells of stretched segments.
+
+    The cell widths grow geometrically from width (with the stretching
+    ratio) until they reach max_width; the rest of the segment is uniform.
+    The arguments can be arrays (broadcast together).
+
+    Parameters
+    ----------
+    length : float or numpy.ndarray
+        Length of the segment.
+    width : float or numpy.ndarray
+        Width of the first cell.
+    ratio : float or numpy.ndarray
+        Stretching ratio (greater than 1).
+    max_width : float or numpy.ndarray
+        Maximum cell width.
+
+    Returns
+    -------
+    numpy.ndarray
+        Number of cells (array of integers).
+
+    """
+    length, width, ratio, max_width = numpy.broadcast_arrays(
+        *(numpy.asarray(a, dtype=float)
+          for a in (length, width, ratio, max_width)))
+    log_r = numpy.log(ratio)
+    # Cells of the stretched part and length they cover.
+    n_s = numpy.ceil(numpy.log(max_width / width) / log_r) + 1
+    L_s = width * (ratio**n_s - 1) / (ratio - 1)
+    # The stretched part does not reach the maximum width.
+    n_short = numpy.ceil(numpy.log1p(length * (ratio - 1) / width) / log_r)
+    n_long = n_s + numpy.maximum(numpy.round((length - L_s) / max_width), 0)
+    ncells = numpy.where(length < L_s, n_short, n_long)
+    return numpy.where(length > 0, ncells, 0).astype(int)
+
+
+def get_gridline_ncells(p1, p2, p3, p4, p5, p6, d1, d2, r1, r2, r3, r4,
+                        max_width=None):
+    """Return the approximate number of cells along a direction.
+
+    The gridline is the one of `get_gridline_config`; the arguments can be
+    arrays (broadcast together) to evaluate many candidates at once.
+
+    Parameters
+    ----------
+    p1, p2, p3, p4, p5, p6 : float or numpy.ndarray
+        Limits of the domain, of the intermediate box, and of the uniform
+        box along the direction.
+    d1 : float
+        Cell width in the intermediate box.
+    d2 : float
+        Cell width in the uniform box.
+    r1, r2, r3, r4 : float or numpy.ndarray
+        Stretching ratios of the sub-domains (from the uniform box).
+    max_width : float, optional
+        Maximum cell width; default is None (20 * d1).
+
+    Returns
+    -------
+    numpy.ndarray
+        Number of cells (array of integers).
+
+    """
+    if max_width is None:
+        max_width = 20 * d1
+    return (get_segment_ncells(numpy.subtract(p2, p1), d1, r1, max_width) +
+            get_segment_ncells(numpy.subtract(p3, p2), d2, r2, d1) +
+            int(round((p4 - p3) / d2)) +
+            get_segment_ncells(numpy.subtract(p5, p4), d2, r3, d1) +
+            get_segment_ncells(numpy.subtract(p6, p5), d1, r4, max_width))
+
+
+def design_mesh(domain, box2, box3, d1, d2, buf=0.0,
+                ratios=STRETCH_RATIOS, offsets=(0.0,), max_width=None,
+                max_ratios=None, max_cells=None, max_memory=None, nprocs=1,
+                bytes_per_cell=BYTES_PER_CELL):
+    """Design the smoothest stretched grid that fits a cell budget.
+
+    In each direction, the uniform box (width d2) covers box3 (plus buf)
+    and the cell width is at most d1 in box2 (extended on all sides by an
+    offset). The candidate grids combine a stretching ratio between the
+    uniform box and box2 (r_in), a ratio from box2 to the boundaries
+    (r_out), and an offset; their number of cells is evaluated at once
+    (vectorized). Among the candidates that fit the budget, the design
+    with the smallest r_in is kept, then the largest offset, then the
+    smallest r_out.
+    The ratios of some faces can be capped (e.g., a smaller r_in
+    downstream to resolve the wake, as in the psi90 run: 1.03 instead
+    of 1.1 on the xend face).
+
+    Parameters
+    ----------
+    domain : tuple of floats
+        Limits of the domain (xstart, xend, ystart, yend, zstart, zend).
+    box2 : tuple of floats
+        Limits of the region with cell width d1 (or less).
+    box3 : tuple of floats
+        Limits of the region with uniform cell width d2
+        (e.g., bounding box of the volume swept by the wing).
+    d1 : float
+        Target cell width in box2.
+    d2 : float
+        Target cell width in box3.
+    buf : float, optional
+        Buffer around box3; default is 0.0.
+    ratios : numpy.ndarray, optional
+        Candidate stretching ratios; default is STRETCH_RATIOS.
+    offsets : tuple of floats, optional
+        Candidate extensions of box2; default is (0.0,).
+    max_width : float, optional
+        Maximum cell width; default is None (20 * d1).
+    max_ratios : dict, optional
+        Maximum stretching ratios (r_in, r_out) of some faces, keyed by
+        face (see FACES), with None for no cap
+        (e.g., {'xend': (1.03, None)}); default is None.
+    max_cells : int, optional
+        Maximum number of cells; default is None (no limit).
+    max_memory : float, optional
+        Maximum memory per rank (in bytes); default is None (no limit).
+    nprocs : int, optional
+        Number of MPI processes; default is 1.
+    bytes_per_cell : float, optional
+        Memory (in bytes) per cell; default is BYTES_PER_CELL.
+
+    Returns
+    -------
+    MeshDesign
+        Configuration of the grid (see petibmpy.CartesianGrid), estimated
+        number of cells, shape (nz, ny, nx), stretching ratios
+        (r_in, r_out, ratios of each face) and offset of box2, and limits
+        of box2 and box3.
+
+    Raises
+    ------
+    ValueError
+        If no budget is given, if a face is unknown, or if no candidate
+        fits the budget.
+
+    """
+    if max_cells is None and max_memory is None:
+        raise ValueError('max_cells or max_memory is required')
+    max_ratios = max_ratios or {}
+    unknown = set(max_ratios) - set(FACES)
+    if unknown:
+        raise ValueError('Unknown faces: {}'
+                         .format(', '.join(sorted(unknown))))
+    caps = [[numpy.inf if cap is None else cap
+             for cap in max_ratios.get(face, (None, None))]
+            for face in FACES]
+
+    def face_ratios(i, r_in, r_out):
+        """Return the ratios r1, r2, r3, r4 of the gridline along i."""
+        (in1, out1), (in2, out2) = caps[2 * i], caps[2 * i + 1]
+        return (numpy.minimum(r_out, out1), numpy.minimum(r_in, in1),
+                numpy.minimum(r_in, in2), numpy.minimum(r_out, out2))
+
+    budget = numpy.inf if max_cells is None else max_cells
+    if max_memory is not None:
+        budget = min(budget, max_memory * nprocs / bytes_per_cell)
+    if max_width is None:
+        max_width = 20 * d1
+    r_in, r_out, offset = numpy.meshgrid(numpy.asarray(ratios, dtype=float),
+                                         numpy.asarray(ratios, dtype=float),
+                                         numpy.asarray(offsets, dtype=float),
+                                         indexing='ij')
+    ncells = numpy.ones(r_in.shape, dtype=numpy.int64)
+    valid = numpy.ones(r_in.shape, dtype=bool)
+    limits = []
+    for i in range(3):
+        p1, p6 = domain[2 * i:2 * i + 2]
+        s, e = box3[2 * i:2 * i + 2]
+        p3, p4 = resize_for_uniform(e - s, (s + e) / 2, d2, buf=buf)
+        p2 = min(box2[2 * i], p3) - offset
+        p5 = max(box2[2 * i + 1], p4) + offset
+        ncells *= get_gridline_ncells(p1, p2, p3, p4, p5, p6, d1, d2,
+                                      *face_ratios(i, r_in, r_out),
+                                      max_width=max_width)
+        valid &= (p2 > p1) & (p5 < p6)
+        limits.append((p1, p3, p4, p6))
+    feasible = valid & (ncells <= budget)
+    if not numpy.any(feasible):
+        raise ValueError('No grid fits the budget of {:.0f} cells '
+                         '(smallest candidate: {} cells)'
+                         .format(budget, ncells[valid].min()))
+    r_in, r_out = r_in[feasible], r_out[feasible]
+    offset, ncells = offset[feasible], ncells[feasible]
+    best = numpy.lexsort((r_out, -offset, r_in))[0]
+    r_in, r_out, offset = (float(r_in[best]), float(r_out[best]),
+                           float(offset[best]))
+    config, shape, box2_out, box3_out = [], [], [], []
+    faces = {}
+    for i, (direction, (p1, p3, p4, p6)) in enumerate(zip('xyz', limits)):
+        p2 = min(box2[2 * i], p3) - offset
+        p5 = max(box2[2 * i + 1], p4) + offset
+        r1, r2, r3, r4 = (float(r) for r in face_ratios(i, r_in, r_out))
+        subdomains = get_gridline_config(p1, p2, p3, p4, p5, p6, d1, d2,
+                                         r1, r2, r3, r4, max_width=max_width)
+        config.append(dict(direction=direction, start=p1,
+                           subDomains=subdomains))
+        shape.insert(0, int(get_gridline_ncells(p1, p2, p3, p4, p5, p6,
+                                                d1, d2, r1, r2, r3, r4,
+                                                max_width=max_width)))
+        faces[FACES[2 * i]], faces[FACES[2 * i + 1]] = (r2, r1), (r3, r4)
+        box2_out += [p2, p5]
+        box3_out += [p3, p4]
+    return MeshDesign(config=config, ncells=int(ncells[best]),
+                      shape=tuple(shape),
+                      ratios=dict(r_in=r_in, r_out=r_out, offset=offset,
+                                  faces=faces),
+                      boxes=(tuple(box2_out), tuple(box3_out)))
+
+
+def create_grid(design):
+    """Create the petibmpy.CartesianGrid of a mesh design."""
+    return petibmpy.CartesianGrid(design.config)
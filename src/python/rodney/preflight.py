@@ -0,0 +1,333 @@
+"""Pre-flight estimates of the cost of a run (memory, disk, wall time)."""
+
+import collections
+import numpy
+import pathlib
+import re
+import yaml
+
+from .logview import get_log_view_report
+
+
+RunEstimate = collections.namedtuple('RunEstimate', ['ncells', 'shape',
+                                                     'nprocs', 'nsteps',
+                                                     'memory_per_rank',
+                                                     'snapshot_size',
+                                                     'nsnapshots',
+                                                     'restart_size',
+                                                     'nrestarts',
+                                                     'probes_size', 'disk',
+                                                     'wall_time'])
+
+# Estimated memory (in bytes) per cell of the PETSc objects of a rank.
+# The runs did not record their memory usage; this is a count of the
+# objects of the decoupled IBPM solver: about 30 scalar vectors (240 B)
+# and the operators (Laplacian, divergence, gradient, and Poisson
+# matrices: about 67 non-zeros per cell, 12 B each in AIJ format, 800 B),
+# rounded up to 1.5 kB for the preconditioners and the MPI buffers.
+BYTES_PER_CELL = 1.5e3
+
+# Wall time (in seconds) to advance one cell by one time step on one process;
+# median of the runs of runs/README.md (run time times 20 processes per
+# node, divided by the number of cells and time steps), which range from
+# 4.2e-6 to 1.4e-5.
+COST_PER_CELL_STEP = 6.65e-6
+
+# Fields written in the snapshots, and additional fields at restart steps
+# (convective terms of the previous time step).
+SNAPSHOT_FIELDS = ('u', 'v', 'w', 'p')
+RESTART_FIELDS = ('u', 'v', 'w')
+
+
+def get_gridline_vertices(start, subdomains):
+    """Return the vertices of the gridline along a direction.
+
+    The cell widths of a sub-domain form a geometric progression
+    (with the stretching ratio as common ratio) between its start and end.
+
+    Parameters
+    ----------
+    start : float
+        Starting point of the gridline.
+    subdomains : list of dict
+        Sub-domains (with keys end, cells, and stretchRatio), as in the
+        mesh section of the configuration file of PetIBM.
+
+    Returns
+    -------
+    numpy.ndarray
+        Coordinates of the vertices.
+
+    """
+    vertices = [numpy.array([start], dtype=float)]
+    for sub in subdomains:
+        end, n = sub['end'], sub['cells']
+        r = sub.get('stretchRatio', 1.0)
+        if abs(r - 1.0) < 1e-12:
+            widths = numpy.full(n, (end - start) / n)
+        else:
+            widths = r**numpy.arange(n) * (end - start) * (r - 1) / (r**n - 1)
+        vertices.append(start + numpy.cumsum(widths))
+        start = end
+    return numpy.concatenate(vertices)
+
+
+def get_field_gridlines(vertices, field):
+    """Return the gridlines of a field on the staggered grid.
+
+    The velocity component along a direction is located on the interior
+    faces of the cells in that direction, at the cell centers in the others;
+    the pressure is located at the cell centers.
+
+    Parameters
+    ----------
+    vertices : list of numpy.ndarray
+        Vertices of the gridlines in the x, y, and z directions.
+    field : str
+        Name of the field ('u', 'v', 'w', or 'p').
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Gridlines of the field in the x, y, and z directions.
+
+    """
+    staggered = {'u': 0, 'v': 1, 'w': 2}.get(field)
+    return [x[1:-1] if i == staggered else 0.5 * (x[:-1] + x[1:])
+            for i, x in enumerate(vertices)]
+
+
+def get_probe_npoints(probe, vertices):
+    """Return the number of grid points inside the box of a volume probe."""
+    npoints = 1
+    for x, (start, end) in zip(get_field_gridlines(vertices, probe['field']),
+                               (probe['box'][d] for d in 'xyz')):
+        npoints *= numpy.count_nonzero((x >= start) & (x <= end))
+    return npoints
+
+
+def get_probe_nwrites(probe, nstart, nt, dt):
+    """Return the number of times a probe writes its data.
+
+    Without n_sum, the probe writes every n_monitor time steps between
+    t_start and t_end; with n_sum, it writes the sum of the values over
+    every n_sum monitored time steps.
+    """
+    steps = numpy.arange(nstart + 1, nt + 1)
+    times = steps * dt
+    mask = ((times >= probe.get('t_start', 0.0) - 1e-12) &
+            (times <= probe.get('t_end', numpy.inf) + 1e-12) &
+            (steps % probe.get('n_monitor', 1) == 0))
+    nsteps = numpy.count_nonzero(mask)
+    if probe.get('n_sum', 0) > 0:
+        return nsteps // probe['n_sum']
+    return nsteps
+
+
+def _count_multiples(nstart, nt, n):
+    """Return the number of multiples of n in ]nstart, nt]."""
+    return nt // n - nstart // n if n else 0
+
+
+def estimate_run_cost(config, probes=None, nprocs=1,
+                      bytes_per_cell=BYTES_PER_CELL,
+                      cost_per_cell_step=COST_PER_CELL_STEP,
+                      itemsize=8):
+    """Estimate the memory, disk footprint, and wall time of a run.
+
+    Parameters
+    ----------
+    config : dict
+        Configuration of the run (content of config.yaml), with the mesh
+        and parameters (nt, nsave, nrestart, dt, and startStep) sections.
+    probes : list of dict, optional
+        Volume probes (content of probes.yaml); default is None.
+    nprocs : int, optional
+        Number of MPI processes; default is 1.
+    bytes_per_cell : float, optional
+        Memory (in bytes) per cell of a rank; default is BYTES_PER_CELL.
+    cost_per_cell_step : float, optional
+        Wall time (in seconds) to advance one cell by one time step on one
+        process (see `calibrate_cost`); default is COST_PER_CELL_STEP.
+    itemsize : int, optional
+        Size (in bytes) of the values written to file; default is 8.
+
+    Returns
+    -------
+    RunEstimate
+        Number of cells, grid shape (nz, ny, nx), number of processes and
+        time steps, memory per rank (bytes), size of a snapshot, number of
+        snapshots, size of the additional restart data, number of
+        restarts, size of the probe files, total disk footprint (bytes),
+        and wall time (seconds).
+
+    """
+    vertices = [get_gridline_vertices(mesh['start'], mesh['subDomains'])
+                for mesh in sorted(config['mesh'],
+                                   key=lambda mesh: mesh['direction'])]
+    shape = tuple(len(x) - 1 for x in vertices[::-1])
+    ncells = int(numpy.prod(shape))
+    params = config['parameters']
+    nstart, nt = params.get('startStep', 0), params['nt']
+    nsteps = nt - nstart
+
+    def field_size(names):
+        return sum(itemsize * numpy.prod([len(x) for x in
+                                          get_field_gridlines(vertices, name)])
+                   for name in names)
+
+    grid_size = itemsize * sum(len(x) for x in vertices) * 4
+    snapshot_size = int(field_size(SNAPSHOT_FIELDS) + grid_size)
+    restart_size = int(field_size(RESTART_FIELDS))
+    nsnapshots = _count_multiples(nstart, nt, params['nsave'])
+    nrestarts = _count_multiples(nstart, nt, params.get('nrestart', 0))
+    probes_size = 0
+    for probe in probes or []:
+        if probe.get('type', 'VOLUME') != 'VOLUME':
+            continue
+        nwrites = get_probe_nwrites(probe, nstart, nt, params['dt'])
+        probes_size += itemsize * get_probe_npoints(probe, vertices) * nwrites
+    disk = (nsnapshots * snapshot_size + nrestarts * restart_size +
+            probes_size)
+    wall_time = None
+    if cost_per_cell_step is not None:
+        wall_time = cost_per_cell_step * ncells * nsteps / nprocs
+    return RunEstimate(ncells=ncells, shape=shape, nprocs=nprocs,
+                       nsteps=nsteps,
+                       memory_per_rank=bytes_per_cell * ncells / nprocs,
+                       snapshot_size=snapshot_size, nsnapshots=nsnapshots,
+                       restart_size=restart_size, nrestarts=nrestarts,
+                       probes_size=probes_size, disk=disk,
+                       wall_time=wall_time)
+
+
+def calibrate_cost(simudirs, logname='view.log'):
+    """Calibrate the cost per cell and time step from past runs.
+
+    Parameters
+    ----------
+    simudirs : list of pathlib.Path
+        Directories of the past runs (those without log file are ignored).
+    logname : str, optional
+        Name of the PETSc log file (-log_view); default is 'view.log'.
+
+    Returns
+    -------
+    float or None
+        Median over the runs of the wall time (in seconds) to advance
+        one cell by one time step on one process;
+        None if no log file was found.
+
+    """
+    reports = get_log_view_report(simudirs, logname=logname)
+    if not reports:
+        return None
+    return float(numpy.median([report.time_per_step * report.nprocs /
+                               report.ncells for report in reports]))
+
+
+def load_run_config(simudir):
+    """Load the configuration and the probes of a run.
+
+    Parameters
+    ----------
+    simudir : pathlib.Path
+        Directory of the run (with config.yaml and, optionally,
+        probes.yaml and the SLURM script pegasus.slurm).
+
+    Returns
+    -------
+    dict
+        Configuration of the run.
+    list of dict
+        Volume probes.
+    dict
+        SLURM options of the script (e.g., 'nodes', 'ntasks-per-node',
+        and 'time').
+
+    """
+    simudir = pathlib.Path(simudir)
+    with open(simudir / 'config.yaml', 'r') as infile:
+        config = yaml.safe_load(infile)
+    probes = []
+    if (simudir / 'probes.yaml').is_file():
+        with open(simudir / 'probes.yaml', 'r') as infile:
+            probes = yaml.safe_load(infile)['probes']
+    slurm = {}
+    if (simudir / 'pegasus.slurm').is_file():
+        text = (simudir / 'pegasus.slurm').read_text()
+        slurm = dict(re.findall(r'^#SBATCH\s+--([\w-]+)=(\S+)', text,
+                                flags=re.MULTILINE))
+    return config, probes, slurm
+
+
+def parse_time_limit(value):
+    """Convert a SLURM time limit to seconds.
+
+    Accepted formats: minutes, minutes:seconds, hours:minutes:seconds,
+    days-hours, days-hours:minutes, and days-hours:minutes:seconds.
+    """
+    days, _, value = value.rpartition('-')
+    fields = [int(field) for field in value.split(':')]
+    if days:
+        fields += [0] * (3 - len(fields))  # hours[:minutes[:seconds]]
+    elif len(fields) < 3:
+        fields = [0] + fields + [0] * (2 - len(fields))  # minutes[:seconds]
+    hours, minutes, seconds = fields
+    return ((int(days or 0) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def check_run_cost(estimate, disk_quota=None, memory_per_rank=None,
+                   time_limit=None):
+    """Raise an error if the estimated cost of a run exceeds the quotas.
+
+    Parameters
+    ----------
+    estimate : RunEstimate
+        Estimated cost of the run.
+    disk_quota : float, optional
+        Available disk space (in bytes); default is None (no limit).
+    memory_per_rank : float, optional
+        Available memory per rank (in bytes); default is None (no limit).
+    time_limit : float, optional
+        Wall-time limit (in seconds); default is None (no limit).
+
+    Raises
+    ------
+    ValueError
+        If an estimate exceeds its quota.
+
+    """
+    errors = []
+    if disk_quota is not None and estimate.disk > disk_quota:
+        errors.append('disk footprint {:.1f} GiB > quota {:.1f} GiB'
+                      .format(estimate.disk / 2**30, disk_quota / 2**30))
+    if (memory_per_rank is not None and
+            estimate.memory_per_rank > memory_per_rank):
+        errors.append('memory per rank {:.2f} GiB > {:.2f} GiB'
+                      .format(estimate.memory_per_rank / 2**30,
+                              memory_per_rank / 2**30))
+    if (time_limit is not None and estimate.wall_time is not None and
+            estimate.wall_time > time_limit):
+        errors.append('wall time {:.1f} h > limit {:.1f} h'
+                      .format(estimate.wall_time / 3600, time_limit / 3600))
+    if errors:
+        raise ValueError('Run exceeds the quotas: ' + '; '.join(errors))
+
+
+def print_run_estimate(estimate):
+    """Print the estimated cost of a run."""
+    gib = 2**30
+    print('cells: {} ({:.1f}M; nz, ny, nx = {})'
+          .format(estimate.ncells, estimate.ncells * 1e-6, estimate.shape))
+    print('processes: {}; time steps: {}'.format(estimate.nprocs,
+                                                 estimate.nsteps))
+    print('memory per rank: {:.2f} GiB'.format(estimate.memory_per_rank / gib))
+    print('snapshots: {} x {:.2f} GiB'.format(estimate.nsnapshots,
+                                              estimate.snapshot_size / gib))
+    print('restart data: {} x {:.2f} GiB'.format(estimate.nrestarts,
+                                                 estimate.restart_size / gib))
+    print('probes: {:.2f} GiB'.format(estimate.probes_size / gib))
+    print('disk footprint: {:.1f} GiB'.format(estimate.disk / gib))
+    if estimate.wall_time is not None:
+        print('wall time: {:.1f} h'.format(estimate.wall_time / 3600))
@@ -1,9 +1,167 @@
 """Functions to load solution from volume probes and interpolate profiles."""
 
+import h5py
 import numpy
 
 import petibmpy
 
+from .interpolation import get_linear_stencil
+
+
+class ProbeReader(object):
+    """Reader for a HDF5 volume probe that keeps the file open.
+
+    The time records and the grid coordinates are read once when the file
+    is opened; records can then be loaded one by one, as a single (nt, ...)
+    array over a time window, or chunk by chunk.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file with the volume probe data.
+    name : str
+        Name of the recorded variable.
+    atol : float, optional
+        Absolute tolerance used to match a time value with a record;
+        default is 1e-6 (time values are stored with 6 decimals).
+
+    """
+
+    def __init__(self, filepath, name, atol=1e-6):
+        """Open the file and cache the time values and grid coordinates."""
+        self.filepath = filepath
+        self.name = name
+        self.atol = atol
+        self.file = h5py.File(filepath, 'r')
+        self.group = self.file[name]
+        self.keys = sorted(self.group.keys(), key=float)
+        self.times = numpy.array([float(key) for key in self.keys])
+        mesh = self.file['mesh']
+        self.grid = tuple(mesh[dim][:] for dim in ('x', 'y', 'z')
+                          if dim in mesh)
+        self.shape = self.group[self.keys[0]].shape
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the HDF5 file."""
+        self.file.close()
+
+    def get_index(self, time):
+        """Return the index of the record at a given time."""
+        i = numpy.argmin(numpy.abs(self.times - time))
+        if abs(self.times[i] - time) > self.atol:
+            raise KeyError(f'No record at time {time} in {self.filepath}')
+        return i
+
+    def get_indices(self, time_limits=None):
+        """Return the indices of the records within a time window.
+
+        Parameters
+        ----------
+        time_limits : tuple of floats, optional
+            Start and end of the time window (both included, up to the
+            tolerance); default is None (all records).
+
+        Returns
+        -------
+        numpy.ndarray
+            Indices of the records as a 1D array of integers.
+
+        """
+        if time_limits is None:
+            return numpy.arange(self.times.size)
+        start, end = time_limits
+        mask = ((self.times >= start - self.atol) &
+                (self.times <= end + self.atol))
+        return numpy.flatnonzero(mask)
+
+    def read(self, time):
+        """Return the grid and the values recorded at a given time.
+
+        Parameters
+        ----------
+        time : float
+            Time value of the record.
+
+        Returns
+        -------
+        tuple of numpy.ndarray
+            Gridline coordinates.
+        numpy.ndarray
+            Recorded values.
+
+        """
+        return self.grid, self.group[self.keys[self.get_index(time)]][:]
+
+    def _read_records(self, indices, out=None):
+        """Read the records with given indices into a single array."""
+        if out is None:
+            out = numpy.empty((len(indices),) + self.shape)
+        for n, i in enumerate(indices):
+            self.group[self.keys[i]].read_direct(out[n])
+        return out
+
+    def read_window(self, time_limits=None):
+        """Return all records of a time window as a single array.
+
+        Parameters
+        ----------
+        time_limits : tuple of floats, optional
+            Start and end of the time window;
+            default is None (all records).
+
+        Returns
+        -------
+        numpy.ndarray
+            Time values as a 1D array of floats.
+        numpy.ndarray
+            Recorded values as an array of floats with shape (nt, ...).
+
+        """
+        indices = self.get_indices(time_limits=time_limits)
+        return self.times[indices], self._read_records(indices)
+
+    def iter_chunks(self, time_limits=None, chunk_size=100):
+        """Iterate over the records of a time window, chunk by chunk.
+
+        Only one chunk is held in memory (the same buffer is reused).
+
+        Parameters
+        ----------
+        time_limits : tuple of floats, optional
+            Start and end of the time window;
+            default is None (all records).
+        chunk_size : int, optional
+            Number of records per chunk; default is 100.
+
+        Yields
+        ------
+        numpy.ndarray
+            Time values of the chunk as a 1D array of floats.
+        numpy.ndarray
+            Recorded values as an array of floats with shape (nc, ...).
+
+        """
+        indices = self.get_indices(time_limits=time_limits)
+        buffer = numpy.empty((min(chunk_size, indices.size),) + self.shape)
+        for start in range(0, indices.size, chunk_size):
+            chunk = indices[start:start + chunk_size]
+            values = self._read_records(chunk, out=buffer[:chunk.size])
+            yield self.times[chunk], values
+
+
+def _read_probe(filepath, name, time):
+    """Read the probe data at a given time from a path or a reader."""
+    if isinstance(filepath, ProbeReader):
+        return filepath.read(time)
+    probe = petibmpy.ProbeVolume(name, name)
+    return probe.read_hdf5(filepath, time)
+
 
 def get_vertical_profile_xy(filepath, name, time, xloc, zloc):
     """Return the profile along the y direction at given x and z locations.
@@ -14,8 +172,9 @@ def get_vertical_profile_xy(filepath, name, time, xloc, zloc):
 
     Parameters
     ----------
-    filepath : pathlib.Path
-        Path of the file with the volume probe data.
+    filepath : pathlib.Path or ProbeReader
+        Path of the file with the volume probe data
+        (or reader with the file already open).
     name : str
         Name of the variable to load.
     time : float
@@ -33,8 +192,7 @@ def get_vertical_profile_xy(filepath, name, time, xloc, zloc):
         Values of the interpolated variable as a 1D array of floats.
 
     """
-    probe = petibmpy.ProbeVolume(name, name)
-    (x, y, z), u = probe.read_hdf5(filepath, time)
+    (x, y, z), u = _read_probe(filepath, name, time)
     u = petibmpy.linear_interpolation(u, z, zloc)
     u = numpy.swapaxes(u, 0, 1)
     u = petibmpy.linear_interpolation(u, x, xloc)
@@ -51,8 +209,9 @@ def get_spanwise_profile_xz(filepath, name, time, xloc, yloc):
 
     Parameters
     ----------
-    filepath : pathlib.Path
-        Path of the file with the volume probe data.
+    filepath : pathlib.Path or ProbeReader
+        Path of the file with the volume probe data
+        (or reader with the file already open).
     name : str
         Name of the variable to load.
     time : float
@@ -70,11 +229,126 @@ def get_spanwise_profile_xz(filepath, name, time, xloc, yloc):
         Values of the interpolated variable as a 1D array of floats.
 
     """
-    probe = petibmpy.ProbeVolume(name, name)
-    (x, y, z), u = probe.read_hdf5(filepath, time)
+    (x, y, z), u = _read_probe(filepath, name, time)
     u = numpy.swapaxes(u, 0, 1)
     u = petibmpy.linear_interpolation(u, y, yloc)
     u = numpy.swapaxes(u, 0, 1)
     u = petibmpy.linear_interpolation(u, x, xloc)
     assert z.size == u.size
     return z, u
+
+
+def get_linear_weights(x, xi):
+    """Return the matrix of 1D linear-interpolation weights.
+
+    Values outside the gridline are linearly extrapolated from the closest
+    interval.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        Gridline coordinates as a 1D array of increasing floats.
+    xi : float or list-alike
+        Locations at which to interpolate.
+
+    Returns
+    -------
+    numpy.ndarray
+        Weights as a 2D array of floats with shape (len(xi), len(x));
+        each row has (at most) two non-zero entries.
+
+    """
+    x = numpy.asarray(x, dtype=float)
+    xi = numpy.atleast_1d(numpy.asarray(xi, dtype=float))
+    weights = numpy.zeros((xi.size, x.size))
+    if x.size == 1:
+        weights[:, 0] = 1.0
+        return weights
+    i, alpha = get_linear_stencil(x, xi)
+    rows = numpy.arange(xi.size)
+    weights[rows, i] = 1 - alpha
+    weights[rows, i + 1] = alpha
+    return weights
+
+
+def get_vertical_profiles_xy(values, grid, xlocs, zloc, ylocs=None):
+    """Return profiles along the y direction at several x locations.
+
+    Vectorized version of `get_vertical_profile_xy` for a stack of
+    snapshots: the 1D interpolation weights along z and x (and optionally
+    along y) are computed once and applied as a tensor contraction.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Probe data as an array of floats with shape (nz, ny, nx)
+        or (nt, nz, ny, nx).
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z) of the probe.
+    xlocs : list-alike
+        Locations along the x direction at which to interpolate data.
+    zloc : float
+        Location along the z direction at which to interpolate data.
+    ylocs : numpy.ndarray, optional
+        Locations along the y direction onto which profiles are
+        resampled; default is None (keep the probe y locations).
+
+    Returns
+    -------
+    numpy.ndarray
+        y locations along the profiles as a 1D array of floats.
+    numpy.ndarray
+        Profiles as an array of floats with shape (nloc, ny)
+        or (nt, nloc, ny).
+
+    """
+    x, y, z = grid
+    wx = get_linear_weights(x, xlocs)
+    wz = get_linear_weights(z, zloc)[0]
+    profiles = numpy.einsum('...kji,li,k->...lj', values, wx, wz,
+                            optimize=True)
+    if ylocs is not None:
+        profiles = profiles @ get_linear_weights(y, ylocs).T
+        y = numpy.asarray(ylocs)
+    return y, profiles
+
+
+def get_spanwise_profiles_xz(values, grid, xlocs, yloc, zlocs=None):
+    """Return profiles along the z direction at several x locations.
+
+    Vectorized version of `get_spanwise_profile_xz` for a stack of
+    snapshots (see `get_vertical_profiles_xy`).
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Probe data as an array of floats with shape (nz, ny, nx)
+        or (nt, nz, ny, nx).
+    grid : tuple of numpy.ndarray
+        Gridline coordinates (x, y, z) of the probe.
+    xlocs : list-alike
+        Locations along the x direction at which to interpolate data.
+    yloc : float
+        Location along the y direction at which to interpolate data.
+    zlocs : numpy.ndarray, optional
+        Locations along the z direction onto which profiles are
+        resampled; default is None (keep the probe z locations).
+
+    Returns
+    -------
+    numpy.ndarray
+        z locations along the profiles as a 1D array of floats.
+    numpy.ndarray
+        Profiles as an array of floats with shape (nloc, nz)
+        or (nt, nloc, nz).
+
+    """
+    x, y, z = grid
+    wx = get_linear_weights(x, xlocs)
+    wy = get_linear_weights(y, yloc)[0]
+    profiles = numpy.einsum('...kji,li,j->...lk', values, wx, wy,
+                            optimize=True)
+    if zlocs is not None:
+        profiles = profiles @ get_linear_weights(z, zlocs).T
+        z = numpy.asarray(zlocs)
+    return z, profiles
@@ -0,0 +1,198 @@
+"""Discovery and selection of the field snapshots of a PetIBM run."""
+
+import collections
+import h5py
+import json
+import numpy
+import os
+import pathlib
+import re
+
+
+Snapshot = collections.namedtuple('Snapshot', ['timestep', 'time', 'path',
+                                               'datasets'])
+
+_SNAPSHOT_PATTERN = re.compile(r'^(\d{7})\.h5$')
+
+
+def _read_snapshot_info(filepath, dt=None):
+    """Return the datasets and time of a snapshot file."""
+    timestep = int(filepath.stem)
+    with h5py.File(filepath, 'r') as infile:
+        datasets = sorted(infile.keys())
+        time = infile.attrs.get('time')
+    if time is not None:
+        time = float(numpy.asarray(time).ravel()[0])
+    elif dt is not None:
+        time = timestep * dt
+    return dict(timestep=timestep, time=time, datasets=datasets)
+
+
+def _write_index(indexpath, index):
+    """Write the index file in place (the directory is left unchanged)."""
+    with open(indexpath, 'w') as outfile:
+        json.dump(index, outfile, indent=1)
+
+
+def get_snapshot_index(datadir, dt=None, index_name='snapshots.json'):
+    """Return the snapshots of a run, using an index file.
+
+    The index (JSON file in the data directory) stores the time-step index,
+    time, and names of the datasets of each snapshot `NNNNNNN.h5`.
+    It is refreshed incrementally: the directory is only listed when
+    its modification time has changed (i.e., when snapshots were added
+    or removed), and the indexed snapshots are only stat-ed; a snapshot
+    is opened only if it is new or if its size or modification time has
+    changed (e.g., datasets added in place by petibm-vorticity).
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the solution files of PetIBM.
+    dt : float, optional
+        Time-step size used to compute the time of the snapshots without
+        a 'time' attribute; default is None (time set to None).
+    index_name : str, optional
+        Name of the index file; default is 'snapshots.json'.
+
+    Returns
+    -------
+    list of Snapshot
+        Snapshots sorted by time-step index.
+
+    """
+    datadir = pathlib.Path(datadir)
+    indexpath = datadir / index_name
+    index = {}
+    if indexpath.is_file():
+        try:
+            with open(indexpath, 'r') as infile:
+                index = json.load(infile)
+        except ValueError:
+            pass  # corrupted index: rebuild it
+    else:
+        # Create the index file before recording the modification time
+        # of the directory (the index is then written in place).
+        try:
+            indexpath.touch()
+        except OSError:
+            pass  # read-only data directory
+    if index.get('dt') != dt:
+        index = {}  # times were computed with another time-step size
+    entries = index.get('snapshots', {})
+    dir_mtime_ns = os.stat(datadir).st_mtime_ns
+    modified = False
+    if index.get('dir_mtime_ns') != dir_mtime_ns:
+        names = [entry.name for entry in os.scandir(datadir)
+                 if _SNAPSHOT_PATTERN.match(entry.name)]
+        entries = {name: entries[name] for name in names if name in entries}
+        for name in names:
+            if name not in entries:
+                entries[name] = None
+        modified = True
+    for name, entry in entries.items():
+        filepath = datadir / name
+        stat = os.stat(filepath)
+        key = [stat.st_size, stat.st_mtime_ns]
+        if entry is None or entry['stat'] != key:
+            entry = _read_snapshot_info(filepath, dt=dt)
+            entry['stat'] = key
+            entries[name] = entry
+            modified = True
+    if modified:
+        index = dict(dt=dt, dir_mtime_ns=dir_mtime_ns, snapshots=entries)
+        try:
+            _write_index(indexpath, index)
+        except OSError:
+            pass  # read-only data directory: the index is not saved
+    return [Snapshot(timestep=entry['timestep'], time=entry['time'],
+                     path=datadir / name, datasets=entry['datasets'])
+            for name, entry in sorted(entries.items())]
+
+
+def select_snapshots(snapshots, names=None, start=None, end=None, stride=1,
+                     time_limits=None, period=None, phases=None, t0=0.0,
+                     atol=1e-6):
+    """Select snapshots by datasets, time-step range, stride, or phase.
+
+    Parameters
+    ----------
+    snapshots : list of Snapshot
+        Snapshots (sorted by time-step index).
+    names : list of str, optional
+        Datasets that the snapshots must contain; default is None.
+    start : int, optional
+        First time-step index (included); default is None.
+    end : int, optional
+        Last time-step index (included); default is None.
+    stride : int, optional
+        Keep every stride-th selected snapshot; default is 1.
+    time_limits : tuple of floats, optional
+        Time interval (included); default is None.
+    period : float, optional
+        Period used to compute the phase of the snapshots; default is None.
+    phases : list of floats, optional
+        Phases to select (in [0, 1), fraction of the period);
+        default is None.
+    t0 : float, optional
+        Time of zero phase; default is 0.0.
+    atol : float, optional
+        Absolute tolerance on the phase; default is 1e-6.
+
+    Returns
+    -------
+    list of Snapshot
+        Selected snapshots.
+
+    Raises
+    ------
+    ValueError
+        If phases are given without the period.
+
+    """
+    if phases is not None and period is None:
+        raise ValueError('period is required with phases')
+    selected = []
+    for snapshot in snapshots:
+        if names is not None and not set(names) <= set(snapshot.datasets):
+            continue
+        if start is not None and snapshot.timestep < start:
+            continue
+        if end is not None and snapshot.timestep > end:
+            continue
+        if time_limits is not None:
+            if (snapshot.time is None or
+                    not time_limits[0] <= snapshot.time <= time_limits[1]):
+                continue
+        if phases is not None:
+            if snapshot.time is None:
+                continue
+            phase = ((snapshot.time - t0) / period) % 1.0
+            diff = numpy.abs(phase - numpy.asarray(phases))
+            if not numpy.any(numpy.minimum(diff, 1.0 - diff) <= atol):
+                continue
+        selected.append(snapshot)
+    return selected[::stride]
+
+
+def get_timesteps(datadir, dt=None, **kwargs):
+    """Return the time-step indices of the available snapshots.
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the solution files of PetIBM.
+    dt : float, optional
+        Time-step size (to select by time or phase); default is None.
+    kwargs : dict
+        Selection criteria (see `select_snapshots`).
+
+    Returns
+    -------
+    list of ints
+        Time-step indices.
+
+    """
+    snapshots = get_snapshot_index(datadir, dt=dt)
+    return [snapshot.timestep
+            for snapshot in select_snapshots(snapshots, **kwargs)]
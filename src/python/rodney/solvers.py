@@ -0,0 +1,197 @@
+"""Iteration counts and residual histories of the linear solvers."""
+
+import collections
+import numpy
+import pathlib
+import re
+
+from .averaging import get_phase_bins
+
+
+SolverHistory = collections.namedtuple('SolverHistory', ['timesteps',
+                                                         'iterations',
+                                                         'residuals',
+                                                         'history',
+                                                         'offsets'])
+
+PhaseStats = collections.namedtuple('PhaseStats', ['phases', 'count', 'mean',
+                                                   'std', 'min', 'max',
+                                                   'residual'])
+
+# Solvers (in the order of the columns of the iterations file of PetIBM).
+SOLVER_NAMES = ('velocity', 'poisson', 'forces')
+
+_KSP_PATTERN = re.compile(r'^\s*(\d+) KSP (?:preconditioned |'
+                          r'unpreconditioned |true )?[Rr]esid(?:ual)? norm\s+'
+                          r'(\S+)')
+_AMGX_START_PATTERN = re.compile(r'^\s*Ini\s+(.*)$')
+_AMGX_ITERATION_PATTERN = re.compile(r'^\s*(\d+)\s+(\S.*)$')
+_AMGX_END_PATTERN = re.compile(r'^\s*Total Iterations:\s*(\d+)')
+
+
+def _get_history(timesteps, residuals_list):
+    """Pack the residual histories of the solves into compact arrays."""
+    offsets = numpy.zeros(len(residuals_list) + 1, dtype=int)
+    offsets[1:] = numpy.cumsum([len(r) for r in residuals_list])
+    history = numpy.array([value for residuals in residuals_list
+                           for value in residuals], dtype=float)
+    return SolverHistory(timesteps=numpy.asarray(timesteps, dtype=int),
+                         iterations=numpy.diff(offsets) - 1,
+                         residuals=history[offsets[1:] - 1],
+                         history=history, offsets=offsets)
+
+
+def get_residual_history(history, i):
+    """Return the residual history of the i-th solve."""
+    return history.history[history.offsets[i]:history.offsets[i + 1]]
+
+
+def read_iterations(filepaths, names=SOLVER_NAMES):
+    """Read the iterations files written by PetIBM.
+
+    Each line contains the time-step index followed by the number of
+    iterations and the final residual of each linear solver.
+    Time steps recomputed after a restart are taken from the last file.
+
+    Parameters
+    ----------
+    filepaths : pathlib.Path or list of pathlib.Path
+        Path(s) of the iterations file(s) (e.g., output/iterations-0.txt),
+        sorted by starting time step.
+    names : tuple of str, optional
+        Name of the solvers (in the order of the columns);
+        default is ('velocity', 'poisson', 'forces').
+
+    Returns
+    -------
+    dict of SolverHistory
+        Time-step indices, numbers of iterations, and final residuals
+        of each solver (no residual history).
+
+    """
+    if isinstance(filepaths, (str, pathlib.Path)):
+        filepaths = [filepaths]
+    data = numpy.concatenate([numpy.loadtxt(filepath, ndmin=2)
+                              for filepath in filepaths])
+    # Keep the last occurrence of each time step.
+    _, indices = numpy.unique(data[::-1, 0], return_index=True)
+    data = data[len(data) - 1 - indices]
+    timesteps = data[:, 0].astype(int)
+    histories = {}
+    for i, name in enumerate(names[:(data.shape[1] - 1) // 2]):
+        histories[name] = SolverHistory(
+            timesteps=timesteps, iterations=data[:, 1 + 2 * i].astype(int),
+            residuals=data[:, 2 + 2 * i], history=None, offsets=None)
+    return histories
+
+
+def read_monitor_output(filepath, nstart=0):
+    """Read the residual histories printed by the linear solvers.
+
+    The standard output of the run is parsed for the residuals printed by
+    PETSc KSP with -<prefix>_ksp_monitor (e.g., velocity solver) and by
+    AmgX with monitor_residual=1 and print_solve_stats=1 (Poisson solver).
+    Each solver is assumed to be called once per time step.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the output file (e.g., slurm-<jobid>.out).
+    nstart : int, optional
+        Starting time step of the run; default is 0.
+
+    Returns
+    -------
+    dict of SolverHistory
+        Time-step indices, numbers of iterations, final residuals,
+        and residual histories (flat array with the offset of each solve)
+        of the KSP ('ksp') and AmgX ('amgx') solves found.
+
+    """
+    solves = collections.OrderedDict(ksp=[], amgx=[])
+    amgx = None  # residuals of the current AmgX solve
+    with open(filepath, 'r') as infile:
+        for line in infile:
+            match = _KSP_PATTERN.match(line)
+            if match:
+                if int(match.group(1)) == 0:
+                    solves['ksp'].append([])
+                if solves['ksp']:
+                    solves['ksp'][-1].append(float(match.group(2)))
+                continue
+            match = _AMGX_START_PATTERN.match(line)
+            if match:
+                amgx = [float(match.group(1).split()[-1])]
+                continue
+            if amgx is None:
+                continue
+            match = _AMGX_END_PATTERN.match(line)
+            if match:
+                solves['amgx'].append(amgx)
+                amgx = None
+                continue
+            match = _AMGX_ITERATION_PATTERN.match(line)
+            if match:
+                # Columns: iteration, [memory usage,] residual, [rate].
+                tokens = match.group(2).split()
+                amgx.append(float(tokens[1] if len(tokens) > 2
+                                  else tokens[0]))
+    return {name: _get_history(nstart + 1 + numpy.arange(len(values)), values)
+            for name, values in solves.items() if values}
+
+
+def get_phase_statistics(history, dt, period, nbins=20, t0=0.0,
+                         limits=None):
+    """Compute statistics of the iteration counts per phase of the cycle.
+
+    Parameters
+    ----------
+    history : SolverHistory
+        Iteration counts and residuals of a solver.
+    dt : float
+        Time-step size.
+    period : float
+        Period of the flapping cycle.
+    nbins : int, optional
+        Number of phase bins over the period; default is 20.
+    t0 : float, optional
+        Time of zero phase; default is 0.0.
+    limits : tuple of floats, optional
+        Time interval to consider (e.g., to skip the first cycles);
+        default is None (all time steps).
+
+    Returns
+    -------
+    PhaseStats
+        Center of the phase bins (fraction of the period), number of time
+        steps, mean, standard deviation, minimum, and maximum number of
+        iterations, and mean final residual in each bin (NaN if empty).
+
+    """
+    times = history.timesteps * dt
+    mask = numpy.ones_like(times, dtype=bool)
+    if limits is not None:
+        mask = (times >= limits[0]) & (times <= limits[1])
+    _, bins = get_phase_bins(times[mask], nbins, period=period, t0=t0)
+    iterations = history.iterations[mask].astype(float)
+    residuals = history.residuals[mask]
+    count = numpy.bincount(bins, minlength=nbins)
+    stats = numpy.full((5, nbins), numpy.nan)
+    for i in numpy.flatnonzero(count):
+        values = iterations[bins == i]
+        stats[:, i] = (values.mean(), values.std(), values.min(),
+                       values.max(), residuals[bins == i].mean())
+    return PhaseStats(phases=(numpy.arange(nbins) + 0.5) / nbins,
+                      count=count, mean=stats[0], std=stats[1],
+                      min=stats[2], max=stats[3], residual=stats[4])
+
+
+def print_phase_statistics(name, stats):
+    """Print the statistics of the iteration counts per phase."""
+    print('[{}] iterations per phase of the cycle'.format(name))
+    print('{:>6} {:>6} {:>8} {:>8} {:>6} {:>6} {:>10}'
+          .format('phase', 'steps', 'mean', 'std', 'min', 'max', 'residual'))
+    for values in zip(stats.phases, stats.count, stats.mean, stats.std,
+                      stats.min, stats.max, stats.residual):
+        print('{:>6.3f} {:>6d} {:>8.2f} {:>8.2f} {:>6.0f} {:>6.0f} {:>10.2e}'
+              .format(*values))
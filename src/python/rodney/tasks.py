@@ -0,0 +1,352 @@
+"""Dependency-graph task runner to generate the figures of the runs."""
+
+import collections
+import concurrent.futures
+import fnmatch
+import math
+import os
+import pathlib
+import re
+import subprocess
+import yaml
+
+from .fields import MAX_WORKERS_ENV
+
+
+Stage = collections.namedtuple('Stage', ['name', 'command', 'cwd', 'inputs',
+                                         'deps', 'memory', 'workers'])
+
+Target = collections.namedtuple('Target', ['name', 'outputs', 'inputs',
+                                           'stages'])
+
+# Scripts that need the vorticity fields computed by petibm-vorticity.
+VORTICITY_SCRIPTS = ('compute_wx_cc.py', 'plot_wx_slices.py',
+                     'plot_vorticity_slices.py', 'get_wx_distances.py')
+
+_SNAPSHOT_PATTERN = re.compile(r'^(.*)/?output/(\d{7})\.h5$')
+
+
+def _match(name, patterns):
+    """Return the value of the first pattern matching a name."""
+    for pattern, value in patterns.items():
+        if fnmatch.fnmatch(name, pattern):
+            return value
+    return None
+
+
+def _get_snapshot_timesteps(inputs):
+    """Return the time steps of the snapshots listed in inputs."""
+    timesteps = collections.defaultdict(set)
+    for path in inputs:
+        match = _SNAPSHOT_PATTERN.match(path)
+        if match:
+            timesteps[match.group(1).rstrip('/')].add(int(match.group(2)))
+    return timesteps
+
+
+def _get_vorticity_command(directory, timesteps):
+    """Return the petibm-vorticity command for a range of time steps."""
+    timesteps = sorted(timesteps)
+    step = 0
+    for diff in (b - a for a, b in zip(timesteps[:-1], timesteps[1:])):
+        step = math.gcd(step, diff)
+    command = ['petibm-vorticity']
+    if directory:
+        command += ['-directory', directory]
+    return command + ['-bg', str(timesteps[0]), '-ed', str(timesteps[-1]),
+                      '-step', str(step or 500)]
+
+
+def load_targets(filepath, rootdir, interpreters=None, memory=None,
+                 default_memory=1.0, workers=None):
+    """Build the stages and targets from the repro-packs YAML file.
+
+    Each entry of the file is a figure (or a glob pattern of figures,
+    relative to the `figures` folder of the run) followed by the scripts
+    that generate it (in order) and the data it depends on (relative to
+    the run directory).
+    A stage runs one script from the run directory; a stage shared by
+    several figures appears once in the graph and depends on the previous
+    scripts listed for all of them.
+    Scripts that need the vorticity fields depend on a petibm-vorticity
+    stage, which runs before any other script of the same figures (as it
+    adds the vorticity to the snapshot files).
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the YAML file (e.g., misc/repro-packs.yaml).
+    rootdir : pathlib.Path
+        Directory with the runs.
+    interpreters : dict, optional
+        Command (list of str) to run the scripts matching a glob pattern
+        (e.g., {'visit_*.py': ['conda', 'run', '-n', 'py27-visit',
+        'python']}); default is None (python for all scripts).
+    memory : dict, optional
+        Estimated memory (in GiB) per process of the scripts matching a
+        glob pattern; default is None.
+    default_memory : float, optional
+        Estimated memory (in GiB) per process of the other stages;
+        default is 1.0.
+    workers : dict, optional
+        Number of processes of the scripts matching a glob pattern
+        (e.g., {'compute_*.py': 4}), passed to their pools through the
+        environment variable RODNEY_MAX_WORKERS; default is None
+        (one process for all stages).
+
+    Returns
+    -------
+    dict of Stage
+        Stages of the graph (keyed by name).
+    list of Target
+        Figures to generate, with the stages that produce them.
+
+    """
+    rootdir = pathlib.Path(rootdir)
+    interpreters, memory = interpreters or {}, memory or {}
+    workers = workers or {}
+    with open(filepath, 'r') as infile:
+        metadata = yaml.safe_load(infile)
+    stages, deps, targets = {}, collections.defaultdict(set), []
+    vorticity = collections.defaultdict(set)
+    for fig, data in metadata.items():
+        if not pathlib.PurePosixPath(fig).suffix:
+            continue  # not a figure (e.g., list of shell scripts)
+        parent = pathlib.PurePosixPath(fig).parent
+        rundir = rootdir / parent
+        scripts = [path for path in data if path.endswith('.py')]
+        inputs = [path for path in data if not path.endswith('.py')]
+        names = []
+        for script in scripts:
+            name = str(parent / script)
+            basename = pathlib.PurePosixPath(script).name
+            interpreter = _match(basename, interpreters) or ['python']
+            stages.setdefault(name, dict(
+                command=list(interpreter) + [script], cwd=rundir,
+                memory=_match(basename, memory) or default_memory,
+                workers=_match(basename, workers) or 1, inputs=set()))
+            stages[name]['inputs'].update(str(rundir / path)
+                                          for path in [script] + inputs)
+            names.append(name)
+        for prev, name in zip(names[:-1], names[1:]):
+            deps[name].add(prev)
+        if any(pathlib.PurePosixPath(script).name in VORTICITY_SCRIPTS
+               for script in scripts):
+            first = names[0]
+            timesteps = _get_snapshot_timesteps(inputs)
+            for directory, steps in sorted(timesteps.items()):
+                name = str(parent / directory / 'vorticity')
+                vorticity[name].update(steps)
+                stages.setdefault(name, dict(cwd=rundir, directory=directory,
+                                             memory=default_memory,
+                                             workers=1, inputs=set()))
+                deps[first].add(name)
+                names.insert(0, name)
+        targets.append(Target(name=fig,
+                              outputs=str(rundir / 'figures' /
+                                          pathlib.PurePosixPath(fig).name),
+                              inputs=[str(rundir / path) for path in data],
+                              stages=names))
+    # Each petibm-vorticity stage covers the time steps of all its figures.
+    for name, steps in vorticity.items():
+        stages[name]['command'] = _get_vorticity_command(
+            stages[name]['directory'], steps)
+    stages = {name: Stage(name=name, command=info['command'],
+                          cwd=info['cwd'], inputs=sorted(info['inputs']),
+                          deps=sorted(deps[name]), memory=info['memory'],
+                          workers=info['workers'])
+              for name, info in stages.items()}
+    return stages, targets
+
+
+def _glob(pattern):
+    """Return the paths matching an absolute glob pattern."""
+    path = pathlib.Path(pattern)
+    return list(pathlib.Path(path.anchor).glob(str(path.relative_to(
+        path.anchor))))
+
+
+def is_target_up_to_date(target):
+    """Check if the figures of a target are newer than its inputs.
+
+    A target with an input pattern matching no file is not up to date
+    (the stages should create or report the missing inputs).
+
+    """
+    outputs = _glob(target.outputs)
+    if not outputs:
+        return False
+    inputs = []
+    for pattern in target.inputs:
+        paths = _glob(pattern)
+        if not paths:
+            print('[{}] Missing input {}'.format(target.name, pattern))
+            return False
+        inputs.extend(paths)
+    if not inputs:
+        return True  # no inputs
+    return (min(os.stat(path).st_mtime_ns for path in outputs) >=
+            max(os.stat(path).st_mtime_ns for path in inputs))
+
+
+def get_stage_order(stages, names):
+    """Return the stages (and their dependencies) in topological order.
+
+    Parameters
+    ----------
+    stages : dict of Stage
+        Stages of the graph.
+    names : list of str
+        Names of the stages to run.
+
+    Returns
+    -------
+    list of str
+        Names of the stages to run (dependencies first).
+
+    """
+    order, state = [], {}
+
+    def visit(name):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError('Cycle in the task graph at {}'.format(name))
+        state[name] = 'visiting'
+        for dep in stages[name].deps:
+            visit(dep)
+        state[name] = 'done'
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def select_stages(stages, targets, patterns=None, force=False):
+    """Return the stages needed to generate the figures.
+
+    Parameters
+    ----------
+    stages : dict of Stage
+        Stages of the graph.
+    targets : list of Target
+        Figures to generate.
+    patterns : list of str, optional
+        Glob patterns of the figures to generate (e.g., 'Re100*/*');
+        default is None (all figures).
+    force : bool, optional
+        Whether to regenerate figures that are up to date; default is False.
+
+    Returns
+    -------
+    list of str
+        Names of the stages to run (in topological order).
+
+    """
+    names = []
+    for target in targets:
+        if patterns and not any(fnmatch.fnmatch(target.name, pattern)
+                                for pattern in patterns):
+            continue
+        if not force and is_target_up_to_date(target):
+            continue
+        names.extend(name for name in target.stages if name not in names)
+    return get_stage_order(stages, names)
+
+
+def _run_command(command, cwd, env=None):
+    """Run a command and return its exit code."""
+    return subprocess.run(command, cwd=cwd, env=env).returncode
+
+
+def run_stages(stages, names, max_workers=None, max_memory=None,
+               dry_run=False, env=None):
+    """Run stages in parallel, respecting their dependencies.
+
+    A stage starts when its dependencies have succeeded, if the processes
+    of the running stages plus its own do not exceed max_workers and their
+    estimated memory does not exceed max_memory (a stage larger than the
+    limits runs alone).
+    The number of processes of each stage is passed to its pools through
+    the environment variable RODNEY_MAX_WORKERS.
+    Stages depending on a failed stage are skipped.
+
+    Parameters
+    ----------
+    stages : dict of Stage
+        Stages of the graph.
+    names : list of str
+        Names of the stages to run (in topological order).
+    max_workers : int, optional
+        Maximum number of processes of the running stages;
+        default is None (number of CPUs).
+    max_memory : float, optional
+        Maximum estimated memory (in GiB) of the running stages;
+        default is None (no limit).
+    dry_run : bool, optional
+        Whether to only print the stages; default is False.
+    env : dict, optional
+        Environment variables of the commands;
+        default is None (current environment with a non-interactive
+        Matplotlib backend).
+
+    Returns
+    -------
+    dict
+        Status of each stage ('done', 'failed', 'skipped').
+
+    """
+    if dry_run:
+        for name in names:
+            stage = stages[name]
+            print('[{}] (cd {} && {})'.format(name, stage.cwd,
+                                              ' '.join(stage.command)))
+        return {name: 'skipped' for name in names}
+    if env is None:
+        env = dict(os.environ, MPLBACKEND='Agg')
+    max_workers = max_workers or os.cpu_count()
+    selected = set(names)
+    pending, running, status = list(names), {}, {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers) as executor:
+        while pending or running:
+            # Skip the stages depending on a failed stage.
+            for name in list(pending):
+                if any(status.get(dep) in ('failed', 'skipped')
+                       for dep in stages[name].deps):
+                    print('[{}] Skipped (failed dependency)'.format(name))
+                    status[name] = 'skipped'
+                    pending.remove(name)
+            # Start the stages that are ready (in topological order).
+            for name in list(pending):
+                stage = stages[name]
+                if any(dep in selected and status.get(dep) != 'done'
+                       for dep in stage.deps):
+                    continue
+                procs = sum(stages[n].workers for n in running.values())
+                used = sum(stages[n].memory * stages[n].workers
+                           for n in running.values())
+                if running and procs + stage.workers > max_workers:
+                    continue
+                if (max_memory is not None and running and
+                        used + stage.memory * stage.workers > max_memory):
+                    continue
+                print('[{}] Starting ...'.format(name))
+                stage_env = dict(env, **{MAX_WORKERS_ENV: str(stage.workers)})
+                future = executor.submit(_run_command, stage.command,
+                                         stage.cwd, env=stage_env)
+                running[future] = name
+                pending.remove(name)
+            if not running:
+                continue
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    ok = future.result() == 0
+                except OSError:
+                    ok = False
+                status[name] = 'done' if ok else 'failed'
+                print('[{}] {}'.format(name, status[name].capitalize()))
+    return status
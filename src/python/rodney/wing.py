@@ -1,5 +1,6 @@
 """Kinematics of the rolling-pitching wing."""
 
+import collections
 import math
 import numpy
 from scipy.spatial import ConvexHull
@@ -8,6 +9,14 @@ import distmesh
 import petibmpy
 
 
+BodyState = collections.namedtuple('BodyState', ['t', 'x', 'u', 'n'])
+BodyFrame = collections.namedtuple('BodyFrame',
+                                   ['chordwise', 'normal', 'spanwise'])
+SweptBox = collections.namedtuple('SweptBox', ['xstart', 'xend',
+                                               'ystart', 'yend',
+                                               'zstart', 'zend'])
+
+
 def rolling(t, A, f):
     """Return the instantaneous rolling angle.
 
@@ -189,6 +198,7 @@ class WingKinematics(object):
         self.size = x.size
         if org:
             self.x0, self.y0, self.z0 = x.copy(), y.copy(), z.copy()
+            self.n = numpy.array([0.0, 1.0, 0.0])  # normal at rest
 
     def get_coordinates(self, org=False):
         if org:
@@ -245,18 +255,36 @@ class WingKinematics(object):
                          roll=roll, yaw=0.0, pitch=pitch,
                          center=self.hook)
 
+    def compute_frame(self, times):
+        """Compute the orthonormal frame attached to the wing.
+
+        The frame is given by the columns of the rotation matrix:
+        the chordwise (x), normal (y), and spanwise (z) directions of the
+        wing at rest, rotated by the rolling and pitching angles.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values (as a 1D array of size nt).
+
+        Returns
+        -------
+        BodyFrame
+            Named tuple with the chordwise tangent, the unit normal,
+            and the spanwise tangent as arrays of floats with shape (nt, 3).
+
+        """
+        R = self.get_rotation_matrices(times)
+        return BodyFrame(chordwise=R[..., 0], normal=R[..., 1],
+                         spanwise=R[..., 2])
+
     def get_normal(self):
-        a = numpy.array([self.x[0], self.y[0], self.z[0]])
-        b = numpy.array([self.x[1], self.y[1], self.z[1]])
-        c = numpy.array([self.x[2], self.y[2], self.z[2]])
-        v1 = (a - b) / numpy.linalg.norm(a - b)
-        v2 = (c - a) / numpy.linalg.norm(c - a)
-        v3 = numpy.cross(v1, v2)
-        return v3 / numpy.linalg.norm(v3)
+        """Return the unit normal of the wing mid-surface."""
+        return self.n
 
     def update_position(self, t):
         self.x, self.y, self.z = self.compute_position(t)
-        self.n = self.get_normal()
+        self.n = self.compute_frame(t).normal[0]
 
     def compute_velocity(self, t):
         phi = self.rolling(t)
@@ -277,6 +305,320 @@ class WingKinematics(object):
     def update_velocity(self, t):
         self.ux, self.uy, self.uz = self.compute_velocity(t)
 
+    def get_reference_points(self):
+        """Return the original coordinates as an (N, 3) array."""
+        return numpy.stack((self.x0, self.y0, self.z0), axis=-1)
+
+    def get_reference_normals(self):
+        """Return the outward unit normal of each marker at rest.
+
+        See `get_body_normals`; the ellipse has semi-axes c / 2 and S / 2.
+
+        Returns
+        -------
+        numpy.ndarray
+            Unit normal vectors as an array of floats with shape (N, 3).
+
+        """
+        a, b = self.c / 2, self.S / 2
+        center = (self.hook[0], self.hook[-1] + b)
+        nx, ny, nz = get_body_normals(self.x0, self.y0, self.z0, a, b,
+                                      center=center)
+        return numpy.stack((nx, ny, nz), axis=-1)
+
+    def get_rotation_matrices(self, times):
+        """Return the rotation matrix at each time value.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values.
+
+        Returns
+        -------
+        numpy.ndarray
+            Rotation matrices as an array of floats with shape (nt, 3, 3).
+
+        """
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        return rotation_matrix(roll=self.rolling(times), yaw=0.0,
+                               pitch=self.pitching(times))
+
+    def get_angular_velocity_matrices(self, times):
+        """Return the matrix W such that u = W (x - x_c) at each time value.
+
+        W is the skew-symmetric matrix of the angular velocity used in
+        `compute_velocity`.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values.
+
+        Returns
+        -------
+        numpy.ndarray
+            Matrices as an array of floats with shape (nt, 3, 3).
+
+        """
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        phi = self.rolling(times)
+        phi_dot = self.rolling_angular_velocity(times)
+        theta_dot = self.pitching_angular_velocity(times)
+        a, b = theta_dot * numpy.cos(phi), theta_dot * numpy.sin(phi)
+        W = numpy.zeros(times.shape + (3, 3))
+        W[:, 0, 1], W[:, 0, 2] = a, -b
+        W[:, 1, 0], W[:, 1, 2] = -a, phi_dot
+        W[:, 2, 0], W[:, 2, 1] = b, -phi_dot
+        return W
+
+    def compute_positions(self, times):
+        """Compute the position of the markers at several time values.
+
+        Contrary to `update_position`, the state of the object is not
+        modified.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values (as a 1D array of size nt).
+
+        Returns
+        -------
+        numpy.ndarray
+            Coordinates of the markers as an array of floats
+            with shape (nt, N, 3).
+
+        """
+        center = numpy.asarray(self.hook, dtype=float)
+        R = self.get_rotation_matrices(times)
+        X0 = self.get_reference_points() - center
+        return numpy.matmul(X0, numpy.swapaxes(R, -1, -2)) + center
+
+    def compute_velocities(self, times):
+        """Compute the velocity of the markers at several time values.
+
+        Velocities are computed from the original coordinates
+        (u = W R (x0 - x_c)), so positions do not need to be stored.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values (as a 1D array of size nt).
+
+        Returns
+        -------
+        numpy.ndarray
+            Velocity of the markers as an array of floats
+            with shape (nt, N, 3).
+
+        """
+        center = numpy.asarray(self.hook, dtype=float)
+        M = numpy.matmul(self.get_angular_velocity_matrices(times),
+                         self.get_rotation_matrices(times))
+        X0 = self.get_reference_points() - center
+        return numpy.matmul(X0, numpy.swapaxes(M, -1, -2))
+
+    def compute_normals(self, times):
+        """Compute the unit normal of the markers at several time values.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values (as a 1D array of size nt).
+
+        Returns
+        -------
+        numpy.ndarray
+            Unit normal vectors as an array of floats with shape (nt, N, 3).
+
+        """
+        R = self.get_rotation_matrices(times)
+        return numpy.matmul(self.get_reference_normals(),
+                            numpy.swapaxes(R, -1, -2))
+
+    def compute_state(self, times):
+        """Compute positions, velocities, and normals at several times.
+
+        Parameters
+        ----------
+        times : float or numpy.ndarray
+            Time values (as a 1D array of size nt).
+
+        Returns
+        -------
+        BodyState
+            Named tuple with the time values (t), and the positions (x),
+            velocities (u), and unit normals (n) of the markers as arrays
+            of floats with shape (nt, N, 3).
+
+        """
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        return BodyState(t=times,
+                         x=self.compute_positions(times),
+                         u=self.compute_velocities(times),
+                         n=self.compute_normals(times))
+
+    def iter_states(self, times, chunk_size=100):
+        """Iterate over chunks of time values and yield the body state.
+
+        Only chunk_size * N * 3 floats per quantity are held in memory,
+        which allows streaming over long time histories.
+
+        Parameters
+        ----------
+        times : numpy.ndarray
+            Time values as a 1D array of floats.
+        chunk_size : int, optional
+            Number of time values per chunk; default is 100.
+
+        Yields
+        ------
+        BodyState
+            Body state for the time values of the chunk.
+
+        """
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        for start in range(0, times.size, chunk_size):
+            yield self.compute_state(times[start:start + chunk_size])
+
+    def get_planform_points(self, ds=0.01, n_outline=720):
+        """Return points covering the elliptical planform of the wing at rest.
+
+        The points are the nodes of a uniform grid (spacing ds) inside the
+        ellipse and points on its contour, in the x/z plane (y = hook).
+
+        Parameters
+        ----------
+        ds : float, optional
+            Spacing between the points inside the ellipse; default is 0.01.
+            If None, only the points on the contour are returned.
+        n_outline : int, optional
+            Number of points on the contour; default is 720.
+
+        Returns
+        -------
+        numpy.ndarray
+            Coordinates of the points as an array of floats with shape (N, 3).
+
+        """
+        a, b = self.c / 2, self.S / 2
+        xc, yc, zc = self.hook[0], self.hook[1], self.hook[-1] + b
+        angles = numpy.linspace(0.0, 2 * numpy.pi, num=n_outline,
+                                endpoint=False)
+        x, z = xc + a * numpy.cos(angles), zc + b * numpy.sin(angles)
+        if ds is None:
+            return numpy.stack((x, numpy.full_like(x, yc), z), axis=-1)
+        xi, zi = numpy.meshgrid(numpy.arange(-a, a + ds / 2, ds),
+                                numpy.arange(-b, b + ds / 2, ds))
+        mask = (xi / a)**2 + (zi / b)**2 < 1.0
+        x = numpy.concatenate((x, xc + xi[mask]))
+        z = numpy.concatenate((z, zc + zi[mask]))
+        return numpy.stack((x, numpy.full_like(x, yc), z), axis=-1)
+
+    def _iter_swept_points(self, times=None, points=None, chunk_size=100,
+                           ds=0.01):
+        """Iterate over chunks of time values and yield the point positions.
+
+        Times default to one period (nt_period values); points default to
+        the markers of the body (if set), otherwise to the planform points.
+        """
+        if times is None:
+            times = numpy.arange(self.nt_period) * self.T / self.nt_period
+        times = numpy.atleast_1d(numpy.asarray(times, dtype=float))
+        if points is None:
+            points = (self.get_reference_points() if hasattr(self, 'x0')
+                      else self.get_planform_points(ds=ds))
+        center = numpy.asarray(self.hook, dtype=float)
+        X0 = numpy.asarray(points, dtype=float) - center
+        for start in range(0, times.size, chunk_size):
+            R = self.get_rotation_matrices(times[start:start + chunk_size])
+            yield numpy.matmul(X0, numpy.swapaxes(R, -1, -2)) + center
+
+    def compute_swept_box(self, times=None, points=None, buf=0.0,
+                          chunk_size=100):
+        """Compute the bounding box of the volume swept by the wing.
+
+        Parameters
+        ----------
+        times : numpy.ndarray, optional
+            Time values; default is None (one period, nt_period values).
+        points : numpy.ndarray, optional
+            Points of the wing at rest as an array of floats with shape
+            (N, 3); default is None (markers of the body if set, otherwise
+            points on the contour of the planform, as the rotated planform
+            is convex).
+        buf : float, optional
+            Buffer added around the box; default is 0.0.
+        chunk_size : int, optional
+            Number of time values processed at once; default is 100.
+
+        Returns
+        -------
+        SweptBox
+            Limits of the box in the x, y, and z directions.
+
+        """
+        lower = numpy.full(3, numpy.inf)
+        upper = numpy.full(3, -numpy.inf)
+        for X in self._iter_swept_points(times=times, points=points,
+                                         chunk_size=chunk_size, ds=None):
+            X = X.reshape(-1, 3)
+            lower = numpy.minimum(lower, X.min(axis=0))
+            upper = numpy.maximum(upper, X.max(axis=0))
+        lower, upper = lower - buf, upper + buf
+        return SweptBox(xstart=lower[0], xend=upper[0],
+                        ystart=lower[1], yend=upper[1],
+                        zstart=lower[2], zend=upper[2])
+
+    def compute_swept_occupancy(self, x, y, z, times=None, points=None,
+                                chunk_size=100):
+        """Compute the cells of a grid crossed by the wing.
+
+        The points should be closer to each other, and the time values
+        closer in time, than the size of the smallest cell of the grid
+        (otherwise cells crossed between two points may be missed).
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            Vertices of the grid in the x direction.
+        y : numpy.ndarray
+            Vertices of the grid in the y direction.
+        z : numpy.ndarray
+            Vertices of the grid in the z direction.
+        times : numpy.ndarray, optional
+            Time values; default is None (one period, nt_period values).
+        points : numpy.ndarray, optional
+            Points of the wing at rest as an array of floats with shape
+            (N, 3); default is None (markers of the body if set, otherwise
+            points covering the planform with a spacing of half the smallest
+            cell width).
+        chunk_size : int, optional
+            Number of time values processed at once; default is 100.
+
+        Returns
+        -------
+        numpy.ndarray
+            Occupancy of the cells as an array of booleans with shape
+            (nz, ny, nx).
+
+        """
+        gridlines = [numpy.asarray(v, dtype=float) for v in (x, y, z)]
+        shape = tuple(v.size - 1 for v in gridlines)
+        occupancy = numpy.zeros(shape[::-1], dtype=bool)
+        ds = 0.5 * min(numpy.diff(v).min() for v in gridlines)
+        for X in self._iter_swept_points(times=times, points=points,
+                                         chunk_size=chunk_size, ds=ds):
+            X = X.reshape(-1, 3)
+            indices = [numpy.searchsorted(v, X[:, d], side='right') - 1
+                       for d, v in enumerate(gridlines)]
+            mask = numpy.all([(i >= 0) & (i < n)
+                              for i, n in zip(indices, shape)], axis=0)
+            i, j, k = (index[mask] for index in indices)
+            occupancy[k, j, i] = True
+        return occupancy
+
 
 def create_ellipse(a, b, center=(0.0, 0.0), ds=0.05):
     """Create discretized ellipse.
@@ -375,6 +717,62 @@ def create_disk(thickness, a, b, center=(0.0, 0.0), ds=0.05):
     z = numpy.concatenate([zb, zt, zl])
     return x, y, z
 
+
+def get_body_normals(x, y, z, a, b, center=(0.0, 0.0), rtol=1e-6):
+    """Return the outward unit normals of a flat plate or a thick disk at rest.
+
+    The body lies in the x/z plane (see `create_ellipse` and `create_disk`).
+    Markers on the upper (bottom) surface get the normal +y (-y);
+    markers in between belong to the lateral surface of the disk and get
+    the normal of the elliptical contour.
+    For a flat plate (all markers at the same y), the normal is +y.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x-coordinates of the markers as a 1D array of floats.
+    y : numpy.ndarray
+        y-coordinates of the markers as a 1D array of floats.
+    z : numpy.ndarray
+        z-coordinates of the markers as a 1D array of floats.
+    a : float
+        Semi-axis of the ellipse along the x direction.
+    b : float
+        Semi-axis of the ellipse along the z direction.
+    center : tuple of floats, optional
+        Center of the ellipse in the x/z plane; default is (0.0, 0.0).
+    rtol : float, optional
+        Tolerance, relative to the semi-axes, used to identify markers
+        on the upper and lower surfaces; default is 1e-6.
+
+    Returns
+    -------
+    numpy.ndarray
+        x-component of the unit normals as a 1D array of floats.
+    numpy.ndarray
+        y-component of the unit normals as a 1D array of floats.
+    numpy.ndarray
+        z-component of the unit normals as a 1D array of floats.
+
+    """
+    xc, zc = center
+    ymin, ymax = numpy.min(y), numpy.max(y)
+    tol = rtol * max(a, b)
+    nx, ny, nz = (numpy.zeros_like(x, dtype=float) for _ in range(3))
+    if ymax - ymin <= tol:
+        ny[:] = 1.0
+        return nx, ny, nz
+    bottom, top = y <= ymin + tol, y >= ymax - tol
+    lateral = ~(bottom | top)
+    ny[bottom], ny[top] = -1.0, 1.0
+    # Gradient of the ellipse equation for markers on the lateral surface.
+    gx = (x[lateral] - xc) / a**2
+    gz = (z[lateral] - zc) / b**2
+    norm = numpy.sqrt(gx**2 + gz**2)
+    nx[lateral], nz[lateral] = gx / norm, gz / norm
+    return nx, ny, nz
+
+
 def rotation(x, y, z,
              roll=0.0, yaw=0.0, pitch=0.0, center=[0.0, 0.0, 0.0]):
     """Rotate point.
@@ -423,5 +821,131 @@ def rotation(x, y, z,
     return xr, yr, zr
 
 
-vrotation = numpy.vectorize(rotation,
-                            excluded=['roll', 'yaw', 'pitch', 'center'])
+def rotation_matrix(roll=0.0, yaw=0.0, pitch=0.0):
+    """Return the rotation matrix composed of roll, yaw, and pitch rotations.
+
+    The composed matrix is R = Rx(roll) Ry(yaw) Rz(pitch), the same
+    rotation applied point by point in `rotation`.
+    The angles can be arrays (e.g., one angle per time value), in which case
+    one matrix is returned for each element of the broadcast angles.
+
+    Parameters
+    ----------
+    roll : float or numpy.ndarray (optional)
+        Roll angle(s) (in radians); default: 0.0.
+    yaw : float or numpy.ndarray (optional)
+        Yaw angle(s) (in radians); default: 0.0.
+    pitch : float or numpy.ndarray (optional)
+        Pitch angle(s) (in radians); default: 0.0.
+
+    Returns
+    -------
+    numpy.ndarray
+        Rotation matrices as an array of floats with shape (..., 3, 3),
+        where ... is the broadcast shape of the angles.
+
+    """
+    roll, yaw, pitch = numpy.broadcast_arrays(*(numpy.asarray(a, dtype=float)
+                                                for a in (roll, yaw, pitch)))
+    cr, sr = numpy.cos(roll), numpy.sin(roll)
+    cy, sy = numpy.cos(yaw), numpy.sin(yaw)
+    cp, sp = numpy.cos(pitch), numpy.sin(pitch)
+    R = numpy.empty(roll.shape + (3, 3))
+    # First row of Ry.Rz (Rx leaves the first row unchanged).
+    R[..., 0, 0] = cy * cp
+    R[..., 0, 1] = cy * sp
+    R[..., 0, 2] = sy
+    # Second and third rows of Rx.(Ry.Rz).
+    R[..., 1, 0] = -cr * sp - sr * sy * cp
+    R[..., 1, 1] = cr * cp - sr * sy * sp
+    R[..., 1, 2] = sr * cy
+    R[..., 2, 0] = sr * sp - cr * sy * cp
+    R[..., 2, 1] = -sr * cp - cr * sy * sp
+    R[..., 2, 2] = cr * cy
+    return R
+
+
+def rotate_points(points, roll=0.0, yaw=0.0, pitch=0.0,
+                  center=[0.0, 0.0, 0.0]):
+    """Rotate an array of points.
+
+    The composed rotation matrix is built once (or once per angle when the
+    angles are arrays) and applied to all points with a single matrix
+    product.
+
+    Parameters
+    ----------
+    points : numpy.ndarray
+        Coordinates of the points as an array of floats with shape (N, 3).
+    roll : float or numpy.ndarray (optional)
+        Roll angle(s) (in radians); default: 0.0.
+    yaw : float or numpy.ndarray (optional)
+        Yaw angle(s) (in radians); default: 0.0.
+    pitch : float or numpy.ndarray (optional)
+        Pitch angle(s) (in radians); default: 0.0.
+    center : list of floats
+        Coordinates of the center of rotation;
+        default: [0.0, 0.0, 0.0].
+
+    Returns
+    -------
+    numpy.ndarray
+        Coordinates of the rotated points as an array of floats
+        with shape (N, 3) for scalar angles, or (nt, N, 3) for angles
+        given as 1D arrays of size nt.
+
+    """
+    center = numpy.asarray(center, dtype=float)
+    R = rotation_matrix(roll=roll, yaw=yaw, pitch=pitch)
+    # Row vectors: (p - c) R^T + c, broadcast over the leading axes of R.
+    RT = numpy.swapaxes(R, -1, -2)
+    return numpy.matmul(numpy.asarray(points) - center, RT) + center
+
+
+def vrotation(x, y, z,
+              roll=0.0, yaw=0.0, pitch=0.0, center=[0.0, 0.0, 0.0]):
+    """Rotate points.
+
+    Vectorized version of `rotation`: the coordinates can be floats or
+    arrays of any shape; the rotation matrix is composed once and applied
+    to all points at once.
+
+    Parameters
+    ----------
+    x : float or numpy.ndarray
+        x-coordinate of the points.
+    y : float or numpy.ndarray
+        y-coordinate of the points.
+    z : float or numpy.ndarray
+        z-coordinate of the points.
+    roll : float or numpy.ndarray (optional)
+        Roll angle(s) (in radians); default: 0.0.
+    yaw : float or numpy.ndarray (optional)
+        Yaw angle(s) (in radians); default: 0.0.
+    pitch : float or numpy.ndarray (optional)
+        Pitch angle(s) (in radians); default: 0.0.
+    center : list of floats
+        Coordinates of the center of rotation;
+        default: [0.0, 0.0, 0.0].
+
+    Returns
+    -------
+    numpy.ndarray
+        x-coordinate of the rotated points.
+    numpy.ndarray
+        y-coordinate of the rotated points.
+    numpy.ndarray
+        z-coordinate of the rotated points.
+        When the angles are 1D arrays of size nt, the rotated coordinates
+        get a leading axis of size nt.
+
+    """
+    x, y, z = numpy.broadcast_arrays(*(numpy.asarray(v, dtype=float)
+                                       for v in (x, y, z)))
+    shape = x.shape
+    points = numpy.stack((x.ravel(), y.ravel(), z.ravel()), axis=-1)
+    new = rotate_points(points, roll=roll, yaw=yaw, pitch=pitch,
+                        center=center)
+    new = new.reshape(new.shape[:-2] + shape + (3,))
+    xr, yr, zr = numpy.moveaxis(new, -1, 0)
+    return xr, yr, zr
@@ -1,17 +1,24 @@
 """Functions to generate plots of the flow field with VisIt."""
 
+import collections
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
+import xml.etree.ElementTree
 import yaml
 
 
 VISIT_DIR = os.environ.get('VISIT_DIR', 'fake')
 VISIT_ARCH = os.environ.get('VISIT_ARCH', 'fake')
 pkgs_dir = os.path.join(VISIT_DIR, VISIT_ARCH, 'lib', 'site-packages')
-if not os.path.exists(pkgs_dir):
+if os.path.exists(pkgs_dir):
+    sys.path.append(pkgs_dir)
+try:
+    import visit  # VisIt module (or a stand-in module on the path)
+except ImportError:
     raise ValueError('Set env variables VISIT_DIR and VISIT_ARCH')
-sys.path.append(pkgs_dir)
-import visit
 
 VISIT_MAKEMOVIE = os.path.join(VISIT_DIR, VISIT_ARCH, 'bin', 'makemovie.py')
 
@@ -24,7 +31,8 @@ def visit_initialize():
 
 def visit_finalize():
     """Terminate engine and close VisIt."""
-    os.remove('visitlog.py')  # remove VisIt-generated log file
+    if os.path.isfile('visitlog.py'):
+        os.remove('visitlog.py')  # remove VisIt-generated log file
     visit.CloseComputeEngine()
     visit.Close()
 
@@ -63,7 +71,7 @@ def visit_get_view(filepath, dim):
     # Load YAML node from file.
     node = 'View{}DAtts'.format(dim)
     with open(filepath, 'r') as infile:
-        config = yaml.load(infile)[node]
+        config = yaml.safe_load(infile)[node]
 
     # Set attributes of the view.
     ViewAtts = getattr(visit, 'View{}DAttributes'.format(dim))()
@@ -104,6 +112,74 @@ def visit_get_states(state=None, states=None, states_range=[0, None, 1]):
     return states
 
 
+def visit_get_save_window_attributes(out_dir=os.getcwd(),
+                                     figsize=(1024, 1024)):
+    """Create the attributes to save the window into PNG files.
+
+    Parameters
+    ----------
+    out_dir : str, optional
+        Output directory; created is non-existent;
+        default is the present working directory (".").
+    figsize : tuple
+        Figure width and height (in pixels); default is (1024, 1024).
+
+    Returns
+    -------
+    visit.SaveWindowAttributes
+        The attributes to save the window.
+
+    """
+    # Create output directory if necessary.
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    SaveWindowAtts = visit.SaveWindowAttributes()
+    SaveWindowAtts.outputToCurrentDirectory = 0
+    SaveWindowAtts.outputDirectory = out_dir
+    SaveWindowAtts.family = 0
+    SaveWindowAtts.format = SaveWindowAtts.PNG
+    SaveWindowAtts.width, SaveWindowAtts.height = figsize
+    SaveWindowAtts.quality = 100
+    SaveWindowAtts.resConstraint = SaveWindowAtts.NoConstraint
+    return SaveWindowAtts
+
+
+def visit_get_timestep():
+    """Get the time-step index of the current state.
+
+    The time-step index is stored as time value in the XDMF file.
+    """
+    visit.Query('Time')
+    return int(visit.GetQueryOutputValue())
+
+
+def visit_get_database_timesteps(xdmf_path):
+    """Get the time-step index of each state of a database.
+
+    The time values are read from the metadata of the database (or from
+    the XDMF file if the metadata has none), so no plot is drawn.
+    The time-step index is stored as time value in the XDMF file.
+
+    Parameters
+    ----------
+    xdmf_path : str
+        Path of the XDMF file.
+
+    Returns
+    -------
+    list of int
+        Time-step index of the states (in the order of the states).
+
+    """
+    times = list(visit.GetMetaData(xdmf_path).times)
+    if not times:
+        tree = xml.etree.ElementTree.parse(xdmf_path)
+        times = [float(elem.get('Value')) for elem in tree.iter('Time')
+                 if elem.get('Value') is not None]
+    return [int(round(time)) for time in times]
+
+
 def visit_render_save_states(states,
                              config_view=None,
                              out_dir=os.getcwd(),
@@ -130,19 +206,9 @@ def visit_render_save_states(states,
     visit.Source(VISIT_MAKEMOVIE)
     visit.ToggleCameraViewMode()
 
-    # Create output directory if necessary.
-    if not os.path.isdir(out_dir):
-        os.makedirs(out_dir)
-
     # Define common attributes to save the window.
-    SaveWindowAtts = visit.SaveWindowAttributes()
-    SaveWindowAtts.outputToCurrentDirectory = 0
-    SaveWindowAtts.outputDirectory = out_dir
-    SaveWindowAtts.family = 0
-    SaveWindowAtts.format = SaveWindowAtts.PNG
-    SaveWindowAtts.width, SaveWindowAtts.height = figsize
-    SaveWindowAtts.quality = 100
-    SaveWindowAtts.resConstraint = SaveWindowAtts.NoConstraint
+    SaveWindowAtts = visit_get_save_window_attributes(out_dir=out_dir,
+                                                      figsize=figsize)
 
     # Define common rendering attributes.
     RenderingAtts = visit.RenderingAttributes()
@@ -158,11 +224,10 @@ def visit_render_save_states(states,
 
         if i == 0:
             visit.DrawPlots()
-            visit.SetView3D(View3DAtts)
+            if config_view is not None:
+                visit.SetView3D(View3DAtts)
 
-        # Get time-step index (stored as time value in XDMF file).
-        visit.Query('Time')
-        timestep = int(visit.GetQueryOutputValue())
+        timestep = visit_get_timestep()
 
         # Set rendering attributes.
         visit.SetRenderingAttributes(RenderingAtts)
@@ -174,56 +239,22 @@ def visit_render_save_states(states,
         visit.SaveWindow()
 
 
-def visit_plot_qcrit_wx_3d(xdmf_path,
-                           qcrit_vals=(6.0, 1.0),
-                           wx_lims=(-5.0, 5.0),
-                           config_view=None,
-                           out_dir=os.getcwd(),
-                           prefix='qcrit_wx_3d_',
-                           figsize=(1024, 1024),
-                           state=None, states=None,
-                           states_range=[0, None, 1]):
-    """Plot the 3D isosurface of the Q-criterion at 2 values.
+def visit_add_qcrit_wx_plots(qcrit_vals=(6.0, 1.0), wx_lims=(-5.0, 5.0)):
+    """Add the 3D isosurface of the Q-criterion at 2 values.
 
     The first isosurface is colored by the streamwise vorticity.
     The second isosurface is colored with a single color (grey).
 
     Parameters
     ----------
-    xdmf_path : str
-        Path of the XDMF file with information about the Q-criterion and
-        the streamwise vorticity.
     qcrit_vals : tuple, optional
         Values of the Q-criterion to display as a tuple of 2 floats;
         default is (6.0, 1.0).
     wx_lims : tuple, optional
         Limits of the color range for the streamwise vorticity
         as a tuple of 2 floats; default is (-5.0, 5.0).
-    config_view : str, optional
-        Path of the YAML file with the configuration of the view;
-        default is None (use default VisIt view).
-    out_dir : str, optional
-        Output directory in which figures will be saved;
-        default is the present working directory.
-    prefix : str, optional
-        Output filename prefix; default is "qcrit_wx_3d_".
-    figsize : tuple
-        Figure width and height (in pixels); default is (1024, 1024).
-    state : int, optional
-        Single state index to render;
-        default is None (i.e., render multiple states).
-    states : list, optional
-        List of states to render; default is None (i.e., render all states).
-    states_range : list, optional
-        Start, end, and step indices for states to render;
-        default is [0, None, 1] (i.e., render all states).
 
     """
-    visit_initialize()
-
-    # Open database from XDMF file.
-    visit.OpenDatabase(xdmf_path, 0)
-
     # Add a pseudocolor of the streamwise vorticity.
     visit.AddPlot('Pseudocolor', 'wx_cc', 1, 0)
     PseudocolorAtts = visit.PseudocolorAttributes()
@@ -263,14 +294,350 @@ def visit_plot_qcrit_wx_3d(xdmf_path,
     AnnotationAtts.axes3D.bboxFlag = 0
     visit.SetAnnotationAttributes(AnnotationAtts)
 
-    # Define state indices to render.
-    states = visit_get_states(state=state, states=states,
-                              states_range=states_range)
 
-    # Render states and save figures to files.
-    visit_render_save_states(states,
-                             config_view=config_view,
-                             out_dir=out_dir, prefix=prefix,
-                             figsize=figsize)
+RenderJob = collections.namedtuple('RenderJob', ['config_view', 'states',
+                                                 'prefix', 'figsize'])
+RenderJob.__new__.__defaults__ = (None,)  # figsize of the session
+
+
+class VisItSession(object):
+    """Persistent VisIt session to render several views of a database.
+
+    The engine is launched and the database opened once.
+    The plots are drawn once; between frames, only the time slider
+    and the view change.
+
+    Parameters
+    ----------
+    xdmf_path : str
+        Path of the XDMF file to open.
+    out_dir : str, optional
+        Output directory in which figures will be saved;
+        default is the present working directory.
+    figsize : tuple, optional
+        Default figure width and height (in pixels);
+        default is (1024, 1024).
+
+    Examples
+    --------
+    >>> with VisItSession(xdmf_path, out_dir=figdir) as session:
+    ...     session.add_qcrit_wx_plots()
+    ...     session.render([RenderJob('lateral.yaml', 5, 'lateral_'),
+    ...                     RenderJob('top.yaml', 5, 'top_', (800, 400))])
+
+    """
+
+    def __init__(self, xdmf_path, out_dir=os.getcwd(), figsize=(1024, 1024)):
+        """Initialize the session (VisIt is launched when opened)."""
+        self.xdmf_path = xdmf_path
+        self.out_dir = out_dir
+        self.figsize = figsize
+        self._views = {}  # view attributes, keyed by path of YAML file
+        self._timesteps = {}  # time-step index, keyed by state
+        self._drawn = False
+
+    def __enter__(self):
+        """Open the session."""
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        """Close the session."""
+        self.close()
+
+    def open(self):
+        """Launch VisIt and open the database."""
+        visit_initialize()
+        visit.OpenDatabase(self.xdmf_path, 0)
+        visit.Source(VISIT_MAKEMOVIE)
+        visit.ToggleCameraViewMode()
+
+    def close(self):
+        """Terminate the engine and close VisIt."""
+        visit_finalize()
+
+    def add_qcrit_wx_plots(self, qcrit_vals=(6.0, 1.0), wx_lims=(-5.0, 5.0)):
+        """Add the plots of the Q-criterion colored by streamwise vorticity.
+
+        See `visit_add_qcrit_wx_plots`.
+        """
+        visit_add_qcrit_wx_plots(qcrit_vals=qcrit_vals, wx_lims=wx_lims)
+        self._drawn = False
+
+    def get_states(self, state=None, states=None, states_range=[0, None, 1]):
+        """Get the state indices to render (see `visit_get_states`)."""
+        return visit_get_states(state=state, states=states,
+                                states_range=list(states_range))
+
+    def get_timesteps(self):
+        """Get the time-step index of each state (read once, no drawing)."""
+        if not self._timesteps:
+            self._timesteps = dict(enumerate(
+                visit_get_database_timesteps(self.xdmf_path)))
+        return self._timesteps
+
+    def get_state(self, timestep):
+        """Get the state index of a time step.
+
+        Parameters
+        ----------
+        timestep : int
+            Time-step index (stored as time value in the XDMF file).
+
+        Returns
+        -------
+        int
+            State index.
+
+        Raises
+        ------
+        ValueError
+            If no state of the database has the time-step index.
+
+        """
+        for state, value in sorted(self.get_timesteps().items()):
+            if value == timestep:
+                return state
+        raise ValueError('No state with time step {} in {}'
+                         .format(timestep, self.xdmf_path))
+
+    def get_view(self, config_view):
+        """Get the 3D view from a YAML file (parsed once)."""
+        if config_view not in self._views:
+            self._views[config_view] = visit_get_view(config_view, 3)
+        return self._views[config_view]
+
+    def get_frames(self, jobs, rank=0, nprocs=1):
+        """Get the frames (state, job index) to render, sorted by state.
+
+        Parameters
+        ----------
+        jobs : list of RenderJob
+            Jobs to render.
+        rank : int, optional
+            Index of the process rendering the frames; default is 0.
+        nprocs : int, optional
+            Number of processes sharing the frames (the states are dealt
+            round-robin to the processes); default is 1.
+
+        Returns
+        -------
+        list of tuples
+            State index and job index of the frames.
+
+        """
+        frames = []
+        for i, job in enumerate(jobs):
+            if job.states is None:
+                states = self.get_states()  # all states
+            elif isinstance(job.states, slice):
+                states = self.get_states()[job.states]
+            elif isinstance(job.states, int):
+                states = [job.states]
+            else:
+                states = job.states
+            frames.extend((state, i) for state in states)
+        states = sorted(set(state for state, _ in frames))[rank::nprocs]
+        return sorted(frame for frame in frames if frame[0] in states)
+
+    def render(self, jobs, rank=0, nprocs=1):
+        """Render and save the frames of a list of jobs into PNG files.
+
+        The frames are sorted by state so that each state is only loaded
+        (and its isosurfaces computed) once for all the views.
+
+        Parameters
+        ----------
+        jobs : list of RenderJob or tuples
+            Jobs to render; each job is a path of the YAML file with the
+            configuration of the view (or None for the current view),
+            a state index or list of state indices (or None for all states,
+            or a slice of all states), a filename prefix, and optionally
+            the figure size.
+        rank : int, optional
+            Index of the process rendering the frames; default is 0.
+        nprocs : int, optional
+            Number of processes sharing the frames; default is 1
+            (render all frames).
+
+        Returns
+        -------
+        list of tuples
+            Job index, state index, and path of the PNG file of each frame
+            rendered (sorted by job and state).
+
+        """
+        jobs = [RenderJob(*job) for job in jobs]
+        RenderingAtts = visit.RenderingAttributes()
+        current_state, current_view = None, None
+        rendered = []
+        for state, i in self.get_frames(jobs, rank=rank, nprocs=nprocs):
+            job = jobs[i]
+            if state != current_state:
+                visit.SetTimeSliderState(state)
+                current_state = state
+            if not self._drawn:
+                visit.DrawPlots()
+                self._drawn = True
+            if job.config_view is not None and job.config_view != current_view:
+                visit.SetView3D(self.get_view(job.config_view))
+                current_view = job.config_view
+            print('[state {}] Rendering and saving figure {} ...'
+                  .format(state, job.prefix))
+            visit.SetRenderingAttributes(RenderingAtts)
+            SaveWindowAtts = visit_get_save_window_attributes(
+                out_dir=self.out_dir, figsize=job.figsize or self.figsize)
+            SaveWindowAtts.fileName = '{}{:0>7}'.format(
+                job.prefix, self.get_timesteps()[state])
+            visit.SetSaveWindowAttributes(SaveWindowAtts)
+            visit.SaveWindow()
+            filepath = os.path.join(self.out_dir,
+                                    SaveWindowAtts.fileName + '.png')
+            rendered.append((i, state, filepath))
+        return sorted(rendered)
+
+
+def _visit_render_worker(args):
+    """Render the frames of a process in its own VisIt session."""
+    (xdmf_path, jobs, rank, nprocs, out_dir, figsize,
+     plot_func, plot_kwargs) = args
+    # Run from a private directory (each VisIt instance writes a log file
+    # in the working directory).
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix='visit{}_'.format(rank))
+    os.chdir(workdir)
+    try:
+        with VisItSession(xdmf_path, out_dir=out_dir,
+                          figsize=figsize) as session:
+            plot_func(**plot_kwargs)
+            return session.render(jobs, rank=rank, nprocs=nprocs)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def visit_render_pool(xdmf_path, jobs, nprocs=2,
+                      out_dir=os.getcwd(),
+                      figsize=(1024, 1024),
+                      plot_func=None, plot_kwargs={}):
+    """Render frames in parallel with a pool of no-window VisIt instances.
+
+    The states of the jobs are dealt round-robin to the processes;
+    each process launches its own engine, opens the database, adds the
+    plots, and renders its frames (see `VisItSession`).
+
+    Parameters
+    ----------
+    xdmf_path : str
+        Path of the XDMF file to open.
+    jobs : list of RenderJob or tuples
+        Jobs to render (see `VisItSession.render`).
+    nprocs : int, optional
+        Number of VisIt instances; default is 2.
+    out_dir : str, optional
+        Output directory in which figures will be saved;
+        default is the present working directory.
+    figsize : tuple, optional
+        Default figure width and height (in pixels);
+        default is (1024, 1024).
+    plot_func : function, optional
+        Module-level function adding the plots to the session;
+        default is None (`visit_add_qcrit_wx_plots`).
+    plot_kwargs : dict, optional
+        Keyword arguments passed to plot_func; default is {}.
+
+    Returns
+    -------
+    list of str
+        Paths of the PNG files (sorted by job and state).
+
+    """
+    if plot_func is None:
+        plot_func = visit_add_qcrit_wx_plots
+    # Paths must not depend on the working directory of the processes.
+    xdmf_path, out_dir = os.path.abspath(xdmf_path), os.path.abspath(out_dir)
+    jobs = [RenderJob(*job) for job in jobs]
+    jobs = [job._replace(config_view=os.path.abspath(job.config_view))
+            if job.config_view is not None else job for job in jobs]
+    args = [(xdmf_path, jobs, rank, nprocs, out_dir, figsize,
+             plot_func, plot_kwargs) for rank in range(nprocs)]
+    if nprocs == 1:
+        results = [_visit_render_worker(args[0])]
+    else:
+        pool = multiprocessing.Pool(nprocs)
+        try:
+            results = pool.map(_visit_render_worker, args)
+        finally:
+            pool.close()
+            pool.join()
+    return [filepath for _, _, filepath in sorted(sum(results, []))]
+
+
+def visit_plot_qcrit_wx_3d(xdmf_path,
+                           qcrit_vals=(6.0, 1.0),
+                           wx_lims=(-5.0, 5.0),
+                           config_view=None,
+                           out_dir=os.getcwd(),
+                           prefix='qcrit_wx_3d_',
+                           figsize=(1024, 1024),
+                           state=None, states=None,
+                           states_range=[0, None, 1],
+                           nprocs=1):
+    """Plot the 3D isosurface of the Q-criterion at 2 values.
+
+    The first isosurface is colored by the streamwise vorticity.
+    The second isosurface is colored with a single color (grey).
+    To render several views, use a `VisItSession` instead.
+    With nprocs > 1, the states are rendered in parallel by a pool of
+    VisIt instances (see `visit_render_pool`).
+
+    Parameters
+    ----------
+    xdmf_path : str
+        Path of the XDMF file with information about the Q-criterion and
+        the streamwise vorticity.
+    qcrit_vals : tuple, optional
+        Values of the Q-criterion to display as a tuple of 2 floats;
+        default is (6.0, 1.0).
+    wx_lims : tuple, optional
+        Limits of the color range for the streamwise vorticity
+        as a tuple of 2 floats; default is (-5.0, 5.0).
+    config_view : str, optional
+        Path of the YAML file with the configuration of the view;
+        default is None (use default VisIt view).
+    out_dir : str, optional
+        Output directory in which figures will be saved;
+        default is the present working directory.
+    prefix : str, optional
+        Output filename prefix; default is "qcrit_wx_3d_".
+    figsize : tuple
+        Figure width and height (in pixels); default is (1024, 1024).
+    state : int, optional
+        Single state index to render;
+        default is None (i.e., render multiple states).
+    states : list, optional
+        List of states to render; default is None (i.e., render all states).
+    states_range : list, optional
+        Start, end, and step indices for states to render;
+        default is [0, None, 1] (i.e., render all states).
+    nprocs : int, optional
+        Number of VisIt instances rendering the states; default is 1.
 
-    visit_finalize()
+    """
+    # Define state indices to render.
+    if state is None and states is None:
+        start, end, step = states_range
+        states = slice(start, end + 1 if end is not None else None, step)
+    job = RenderJob(config_view, state if state is not None else states,
+                    prefix)
+    plot_kwargs = dict(qcrit_vals=qcrit_vals, wx_lims=wx_lims)
+    if nprocs > 1:
+        visit_render_pool(xdmf_path, [job], nprocs=nprocs, out_dir=out_dir,
+                          figsize=figsize,
+                          plot_func=visit_add_qcrit_wx_plots,
+                          plot_kwargs=plot_kwargs)
+        return
+    with VisItSession(xdmf_path, out_dir=out_dir, figsize=figsize) as session:
+        session.add_qcrit_wx_plots(**plot_kwargs)
+        # Render states and save figures to files.
+        session.render([job])